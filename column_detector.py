@@ -1,8 +1,18 @@
 import numpy as np
-from scipy.stats import gaussian_kde
 from collections import defaultdict
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional, Final
 from dataclasses import dataclass
+from functools import cached_property
+
+# Paramètres de la détection deux colonnes par densité
+MIN_BOX_WIDTH_RATIO: Final[float] = 0.15   # largeur minimale d'une boîte / largeur du layout
+MIN_SPREAD_RATIO: Final[float] = 0.6       # étendue minimale des milieux / largeur du layout
+KDE_GRID_POINTS: Final[int] = 100          # points d'évaluation de la densité
+KDE_DIRECT_CHUNK: Final[int] = 4096        # milieux par bloc dans la somme exacte
+MIDDLE_START_IDX: Final[int] = int(KDE_GRID_POINTS * 0.3)
+MIDDLE_END_IDX: Final[int] = int(KDE_GRID_POINTS * 0.7)
+MIDDLE_DIP_THRESHOLD: Final[float] = 0.4   # creux central, relatif au pic
+SIDE_PEAK_THRESHOLD: Final[float] = 0.6    # pics gauche/droite, relatifs au pic
 
 @dataclass
 class TextBox:
@@ -45,6 +55,13 @@ class Layout:
     def height(self) -> float:
         return self.bbox_layout[3] - self.bbox_layout[1]
     
+    @cached_property
+    def boxes_arr(self) -> np.ndarray:
+        """Text boxes as a single (N, 4) array of [x_start, y_start, x_end, y_end]."""
+        if not self.bbox_text:
+            return np.empty((0, 4), dtype=np.float64)
+        return np.asarray(self.bbox_text, dtype=np.float64)
+
     @property
     def text_boxes(self) -> List[TextBox]:
         """Convert bbox_text and text to TextBox objects."""
@@ -70,36 +87,87 @@ class ColumnDetector:
         """
         Detect if a layout contains a two-column structure using only the density method.
         """
-        if 'bbox_text' not in layout or not layout['bbox_text']:
+        # Rejet rapide sur le dict : pas de Layout construit quand il n'y a pas assez de boîtes
+        bbox_text = layout.get('bbox_text')
+        if not bbox_text or len(bbox_text) < self.min_text_boxes_init:
             return False
-        
+
         layout_obj = Layout(
             bbox_layout=layout['bbox_layout'],
             label=layout.get('label', ''),
-            bbox_text=layout.get('bbox_text'),
+            bbox_text=bbox_text,
             text=layout.get('text')
         )
-        
-        all_text_boxes = layout_obj.text_boxes
+        return self.detect_in_layout(layout_obj)
+
+    def detect_in_layout(self, layout_obj: Layout) -> bool:
+        """
+        Same as detect_two_column_layout, for an already built Layout object.
+        """
+        # Rejet rapide : même sans filtrage, il n'y a pas assez de boîtes.
+        if not layout_obj.bbox_text or len(layout_obj.bbox_text) < self.min_text_boxes_init:
+            return False
+
         layout_width = layout_obj.width
 
         if layout_width == 0: return False # Éviter la division par zéro
-        
-        selected_text_boxes = [
-            box for box in all_text_boxes 
-            if (box.width / layout_width) >= 0.15
-        ]
-        
+
+        boxes = layout_obj.boxes_arr
+        x_start, x_end = boxes[:, 0], boxes[:, 2]
+
+        selected = ((x_end - x_start) / layout_width) >= MIN_BOX_WIDTH_RATIO
+
         # Le seuil du nombre de boîtes est maintenant appliqué aux boîtes sélectionnées.
-        if len(selected_text_boxes) < self.min_text_boxes_init:
+        if np.count_nonzero(selected) < self.min_text_boxes_init:
             return False
-        
-        x_midpoints = [box.midpoint_x for box in selected_text_boxes]
-        
+
+        x_midpoints = (x_start[selected] + x_end[selected]) / 2
+
         # The only algorithm now being called is the density based one.
         return self._is_two_column_by_density(x_midpoints, layout_obj.width)
 
-    def _is_two_column_by_density(self, x_midpoints: List[float], layout_width: float) -> bool:
+    def detect_two_column_layouts(self, layouts: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Batch version of detect_two_column_layout for several layouts of a page.
+
+        The text boxes of all layouts are stacked into one array so the width filter
+        and the midpoints are computed in a single pass; only the layouts that keep
+        enough boxes go through the density check, on their own slice of midpoints.
+        """
+        results = [False] * len(layouts)
+
+        candidates = [
+            k for k, layout in enumerate(layouts)
+            if layout.get('bbox_text')
+            and len(layout['bbox_text']) >= self.min_text_boxes_init
+            and layout['bbox_layout'][2] - layout['bbox_layout'][0] != 0
+        ]
+        if not candidates:
+            return results
+
+        counts = np.array([len(layouts[k]['bbox_text']) for k in candidates])
+        layout_widths = np.array([layouts[k]['bbox_layout'][2] - layouts[k]['bbox_layout'][0]
+                                  for k in candidates], dtype=np.float64)
+        boxes = np.asarray([bbox for k in candidates for bbox in layouts[k]['bbox_text']],
+                           dtype=np.float64)
+        layout_ids = np.repeat(np.arange(len(candidates)), counts)
+
+        x_start, x_end = boxes[:, 0], boxes[:, 2]
+        selected = ((x_end - x_start) / layout_widths[layout_ids]) >= MIN_BOX_WIDTH_RATIO
+        selected_counts = np.bincount(layout_ids[selected], minlength=len(candidates))
+        x_midpoints = (x_start + x_end) / 2
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+
+        for j, k in enumerate(candidates):
+            if selected_counts[j] < self.min_text_boxes_init:
+                continue
+            start, end = bounds[j], bounds[j + 1]
+            results[k] = self._is_two_column_by_density(
+                x_midpoints[start:end][selected[start:end]], layout_widths[j])
+
+        return results
+
+    def _is_two_column_by_density(self, x_midpoints: np.ndarray, layout_width: float) -> bool:
         """
         Detect two-column structure by analyzing the density distribution of text box midpoints.
         This version includes checks to avoid false positives on signatures or narrow content.
@@ -110,52 +178,67 @@ class ColumnDetector:
 
         # --- RÈGLE 2: Vérification de la largeur du contenu (filtre anti-signature) ---
         # Calculer l'étendue horizontale réelle occupée par le texte.
-        text_spread = max(x_midpoints) - min(x_midpoints)
+        x_min, x_max = x_midpoints.min(), x_midpoints.max()
+        text_spread = x_max - x_min
+
+        # Tous les milieux confondus : la bande passante serait nulle.
+        if text_spread == 0:
+            return False
         
         # Le contenu textuel doit occuper au moins 60% de la largeur totale du layout.
         # Cela empêche les blocs de texte étroits (comme les signatures) d'être détectés.
-        if (text_spread / layout_width) < 0.6:
+        if (text_spread / layout_width) < MIN_SPREAD_RATIO:
             return False
 
-        try:
-            x_range = np.linspace(min(x_midpoints), max(x_midpoints), 100)
-            try:
-                kde = gaussian_kde(x_midpoints, bw_method='silverman')
-                density = kde(x_range)
-                density = density / np.max(density)
-                
-                middle_region_start = int(len(density) * 0.3)
-                middle_region_end = int(len(density) * 0.7)
-                middle_density = density[middle_region_start:middle_region_end]
-                
-                if len(middle_density) > 0:
-                    min_density_in_middle = np.min(middle_density)
-                    max_density = 1.0 # Since it's normalized
-                    
-                    if min_density_in_middle < 0.4:
-                        left_peak = np.max(density[:middle_region_start])
-                        right_peak = np.max(density[middle_region_end:])
-                        
-                        if left_peak > 0.6  and right_peak > 0.6 :
-                            return True
-            except Exception:
-                return False
-                
-            return False
-        except Exception:
-            return False
+        # La grille d'évaluation n'est allouée qu'une fois les filtres rapides passés.
+        density = self._gaussian_density(x_midpoints, x_min, x_max)
+        # Les seuils sont exprimés relativement au pic : pas besoin de normaliser la courbe.
+        max_density = density.max()
+
+        if density[MIDDLE_START_IDX:MIDDLE_END_IDX].min() < MIDDLE_DIP_THRESHOLD * max_density:
+            left_peak = density[:MIDDLE_START_IDX].max()
+            right_peak = density[MIDDLE_END_IDX:].max()
+
+            if (left_peak > SIDE_PEAK_THRESHOLD * max_density and
+                    right_peak > SIDE_PEAK_THRESHOLD * max_density):
+                return True
+
+        return False
+
+    def _gaussian_density(self, x_midpoints: np.ndarray, x_min: float, x_max: float,
+                          num_points: int = KDE_GRID_POINTS) -> np.ndarray:
+        """
+        Estimate the Gaussian kernel density of the midpoints (up to a constant factor)
+        on num_points evenly spaced positions between x_min and x_max.
+
+        The bandwidth follows Silverman's rule exactly as gaussian_kde computes it, and
+        the density is the exact sum of Gaussians (in blocks of midpoints, to bound
+        memory), so the decisions match gaussian_kde.
+        """
+        n = len(x_midpoints)
+        bandwidth = np.std(x_midpoints, ddof=1) * (n * 3 / 4) ** (-1 / 5)
+
+        x_range = np.linspace(x_min, x_max, num_points)
+
+        density = np.zeros(num_points)
+        for start in range(0, n, KDE_DIRECT_CHUNK):
+            diffs = (x_range[:, None] - x_midpoints[None, start:start + KDE_DIRECT_CHUNK]) / bandwidth
+            density += np.exp(-0.5 * diffs * diffs).sum(axis=1)
+        return density
 
     def detect_two_column_layout_v2(self, layout: Dict[str, Any]) -> bool:
         """
         Detect if a layout contains a two-column structure using only the density method.
         """
-        if 'bbox_text' not in layout or not layout['bbox_text']:
+        # Rejet rapide sur le dict : moins de boîtes que le seuil, donc moins de boîtes sélectionnées
+        bbox_text = layout.get('bbox_text')
+        if not bbox_text or len(bbox_text) < self.min_text_boxes_init:
             return False
         
         layout_obj = Layout(
             bbox_layout=layout['bbox_layout'],
             label=layout.get('label', ''),
-            bbox_text=layout.get('bbox_text'),
+            bbox_text=bbox_text,
             text=layout.get('text')
         )
         
@@ -166,7 +249,7 @@ class ColumnDetector:
         
         selected_text_boxes = [
             box for box in all_text_boxes 
-            if (box.width / layout_width) >= 0.15
+            if (box.width / layout_width) >= MIN_BOX_WIDTH_RATIO
         ]
         
         # Le seuil du nombre de boîtes est maintenant appliqué aux boîtes sélectionnées.
@@ -192,46 +275,63 @@ class LayoutAnalyzer:
         self.min_layout_width = min_layout_width
         self.min_layout_height = min_layout_height
         self.column_detector = ColumnDetector()
-    
-    def enhanced_layout_peek(self, page: Dict[str, Any]) -> List[int]:
+
+    def enhanced_layout_peek(self, page: Dict[str, Any], bboxes: Optional[np.ndarray] = None) -> List[int]:
         """
         Enhanced function to detect layouts that might contain two-column structures.
+
+        bboxes, if given, is the page's (N, 4) array of bbox_layout values.
         """
-        layout_indices: List[int] = []
-        
-        for i, layout_data in enumerate(page['page']):
-            layout = Layout(
-                bbox_layout=layout_data['bbox_layout'],
-                label=layout_data.get('label', ''),
-                bbox_text=layout_data.get('bbox_text'),
-                text=layout_data.get('text')
-            )
-            
-            large_layout_condition = (
-                
-                layout.width > self.large_layout_width and 
-                layout.height > self.large_layout_height
-            )
-            
-            if large_layout_condition:
-                layout_indices.append(i)
-            elif (
-                  layout.bbox_text and 
-                  layout.width > self.min_layout_width and
-                  layout.height > self.min_layout_height):
-                
-                if self.column_detector.detect_two_column_layout(layout_data):
-                    layout_indices.append(i)
-        
-        return layout_indices
+        return self.enhanced_layout_peeks([page], None if bboxes is None else [bboxes])[0]
+
+    def enhanced_layout_peeks(self, pages: List[Dict[str, Any]],
+                              page_bboxes: Optional[List[np.ndarray]] = None) -> List[List[int]]:
+        """
+        Run enhanced_layout_peek on several pages, e.g. all pages of a document.
+
+        The size filters run on each page's bbox array at once (page_bboxes, if
+        given, holds one (N, 4) array per page), and the candidate layouts of
+        every page go through the two-column detection in a single batch.
+        """
+        peeks: List[List[int]] = []
+        candidates: List[Tuple[int, int]] = []  # (page position, layout index)
+
+        for page_pos, page in enumerate(pages):
+            layouts = page['page']
+            bboxes = page_bboxes[page_pos] if page_bboxes is not None else None
+            if bboxes is None:
+                bboxes = [layout_data['bbox_layout'] for layout_data in layouts]
+            # (N, 4) même pour une page sans layout
+            bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+            widths = bboxes[:, 2] - bboxes[:, 0]
+            heights = bboxes[:, 3] - bboxes[:, 1]
+
+            is_large = (widths > self.large_layout_width) & (heights > self.large_layout_height)
+            is_candidate_size = ~is_large & (widths > self.min_layout_width) & (heights > self.min_layout_height)
+            peeks.append(np.flatnonzero(is_large).tolist())
+            # Seules les tailles retenues consultent le dict du layout
+            candidates.extend((page_pos, i) for i in np.flatnonzero(is_candidate_size).tolist()
+                              if layouts[i].get('bbox_text'))
+
+        if candidates:
+            detected = self.column_detector.detect_two_column_layouts([pages[p]['page'][i] for p, i in candidates])
+            for (page_pos, i), is_two_column in zip(candidates, detected):
+                if is_two_column:
+                    peeks[page_pos].append(i)
+            for layout_indices in peeks:
+                layout_indices.sort()
+
+        return peeks
     
 # Legacy functions for backward compatibility
+# Instances partagées : les fonctions ci-dessous ne reconstruisent pas d'objets à chaque appel.
+_DEFAULT_DETECTOR = ColumnDetector()
+_DEFAULT_ANALYZER = LayoutAnalyzer()
+
 def detect_two_column_layout(layout: Dict[str, Any]) -> bool:
     """Legacy function for backward compatibility."""
-    detector = ColumnDetector()
-    return detector.detect_two_column_layout(layout)
+    return _DEFAULT_DETECTOR.detect_two_column_layout(layout)
 
 def enhanced_layout_peek(page: Dict[str, Any]) -> List[int]:
     """Legacy function for backward compatibility."""
-    analyzer = LayoutAnalyzer()
-    return analyzer.enhanced_layout_peek(page)
\ No newline at end of file
+    return _DEFAULT_ANALYZER.enhanced_layout_peek(page)
@@ -1,7 +1,18 @@
+import os
+import threading
 import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
 from PIL import Image, ImageTk
-from pathlib import Path
+
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff'})
+YEAR_CACHE_SIZE = 8  # nombre d'années dont la liste de fichiers reste en mémoire
+IMAGE_CACHE_SIZE = 5  # images déjà décodées gardées en mémoire
+JPEG_EXTENSIONS = frozenset({'.jpg', '.jpeg'})
+THUMBS_DIRNAME = 'thumbs'  # miniatures écrites à côté des PNG par modified_visualizer
+WARM_THUMB_COUNT = 20  # premières images de l'année préparées en arrière-plan
+WARM_THUMB_SIZE = (1600, 1200)
 
 class ImageViewer:
     def __init__(self, root):
@@ -14,14 +25,39 @@ class ImageViewer:
         self.current_image_index = 0
         self.years = list(range(1965, 2026))
         self.current_images = []
+        # Listes de fichiers déjà lues, par année (LRU)
+        self._year_cache = OrderedDict()
+        # Décodage anticipé des images voisines (LRU partagé avec le thread)
+        self._decode_pool = ThreadPoolExecutor(max_workers=1)
+        self._img_cache = OrderedDict()
+        self._img_lock = threading.Lock()
+        # Miniatures préparées à l'ouverture d'une année : chemin -> (miniature, taille réelle)
+        self._thumb_cache = {}
+        # Lot de miniatures en cours : annulé ou rendu obsolète au changement d'année
+        self._warm_future = None
+        self._warm_generation = 0
         
         # Variables pour le zoom
         self.zoom_level = 1.0
-        self.original_image = None
+        self.original_image = None  # pleine résolution, chargée à la demande
+        self.display_image = None  # source de l'affichage à zoom 1.0 (éventuellement réduite)
+        self.image_size = None  # taille réelle de l'image courante
+        self.current_image_path = None
         self.image_on_canvas = None
+        # Rendu rapide pendant la molette, rendu LANCZOS une fois le geste terminé
+        self._interactive = False
+        self._finalize_after = None
+        # Événements molette regroupés en un seul rendu par trame
+        self._pending_zoom = None
+        self._zoom_after = None
+        # Dernier rendu (source, taille, filtre) pour éviter de refaire le même PhotoImage
+        self._last_render_source = None
+        self._last_render_key = None
         
         self.setup_ui()
         self.load_images_for_year()
+        # Arrêter le thread de décodage avant de détruire la fenêtre
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def setup_ui(self):
         # Main frame
@@ -37,6 +73,7 @@ class ImageViewer:
                                  values=[str(y) for y in self.years], state="readonly")
         year_combo.pack(side=tk.LEFT, padx=(5, 0))
         year_combo.bind('<<ComboboxSelected>>', self.on_year_change)
+        ttk.Button(year_frame, text="Refresh", command=self.refresh_year).pack(side=tk.LEFT, padx=(5, 0))
         
         canvas_frame = ttk.Frame(main_frame)
         canvas_frame.pack(fill=tk.BOTH, expand=True)
@@ -95,24 +132,55 @@ class ImageViewer:
         self.next_button.pack(side=tk.RIGHT)
         
     def load_images_for_year(self):
-        year_folder = Path(self.base_folder) / str(self.current_year)
-        self.current_images = []
-        
-        if year_folder.exists():
-            image_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff'}
-            for file_path in year_folder.iterdir():
-                if file_path.suffix.lower() in image_extensions:
-                    self.current_images.append(file_path)
+        cached_images = self._year_cache.get(self.current_year)
+        if cached_images is not None:
+            self._year_cache.move_to_end(self.current_year)
+            self.current_images = cached_images
+        else:
+            self.current_images = self._scan_year_folder()
+            self._year_cache[self.current_year] = self.current_images
+            if len(self._year_cache) > YEAR_CACHE_SIZE:
+                self._year_cache.popitem(last=False)
         
-        self.current_images.sort()
         self.current_image_index = 0
+        self._cancel_pending_zoom()
         self.zoom_level = 1.0  # Reset zoom when changing year
         self.display_current_image()
         self.update_navigation_buttons()
         
+        # Préparer les premières miniatures après le décodage des voisines
+        if self._warm_future is not None:
+            self._warm_future.cancel()
+        with self._img_lock:
+            self._warm_generation += 1
+            self._thumb_cache.clear()
+        self._warm_future = self._decode_pool.submit(
+            self._warm_thumbs, list(self.current_images[:WARM_THUMB_COUNT]), self._warm_generation)
+        
+    def _scan_year_folder(self):
+        year_folder = os.path.join(self.base_folder, str(self.current_year))
+        images = []
+        
+        if os.path.isdir(year_folder):
+            # os.scandir évite de construire un objet Path par fichier
+            with os.scandir(year_folder) as entries:
+                images = [
+                    entry.path for entry in entries
+                    if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+                ]
+        
+        images.sort()
+        return images
+    
+    def refresh_year(self):
+        # Relire le dossier de l'année courante sur demande
+        self._year_cache.pop(self.current_year, None)
+        self.load_images_for_year()
+    
     def display_current_image(self):
         if not self.current_images:
             self.canvas.delete("all")
+            self.image_on_canvas = None
             self.canvas.create_text(400, 300, text="No images found for this year", 
                                   font=("Arial", 16), fill="gray")
             self.image_info_label.config(text="")
@@ -121,58 +189,194 @@ class ImageViewer:
             
         try:
             image_path = self.current_images[self.current_image_index]
-            self.original_image = Image.open(image_path)
+            self.current_image_path = image_path
+            self.display_image = self._load_display_image(image_path)
             
             # Appliquer le zoom à l'image originale
             self.apply_zoom()
             
             # Update info label
-            info_text = f"Image {self.current_image_index + 1} of {len(self.current_images)} - {image_path.name}"
+            info_text = f"Image {self.current_image_index + 1} of {len(self.current_images)} - {os.path.basename(image_path)}"
             self.image_info_label.config(text=info_text)
             
+            self._prefetch_neighbours()
+            
         except Exception as e:
             self.canvas.delete("all")
+            self.image_on_canvas = None
             self.canvas.create_text(400, 300, text=f"Error loading image: {str(e)}", 
                                   font=("Arial", 12), fill="red")
             self.image_info_label.config(text="")
             self.zoom_label.config(text="Zoom: 100%")
     
-    def apply_zoom(self):
-        if self.original_image is None:
+    def _fit_box(self):
+        # Boîte d'affichage à zoom 1.0 selon l'option de taille (None = taille originale)
+        size_option = self.size_var.get()
+        if size_option == "Grande":
+            return (1000, 700)
+        if size_option == "Ajustée":
+            canvas_width = self.canvas.winfo_width() - 20
+            canvas_height = self.canvas.winfo_height() - 20
+            if canvas_width > 1 and canvas_height > 1:
+                return (canvas_width, canvas_height)
+            return (800, 600)
+        return None
+    
+    def _load_display_image(self, image_path):
+        with self._img_lock:
+            image = self._img_cache.get(image_path)
+            if image is not None:
+                self._img_cache.move_to_end(image_path)
+        if image is not None:
+            self.original_image = image
+            self.image_size = image.size
+            return image
+        
+        self.original_image = None
+        fit_box = self._fit_box()
+        with self._img_lock:
+            warm_thumb = self._thumb_cache.get(image_path)
+        if warm_thumb is not None and fit_box is not None and self.zoom_level == 1.0:
+            thumb, self.image_size = warm_thumb
+            scale = min(1.0, fit_box[0] / self.image_size[0], fit_box[1] / self.image_size[1])
+            if thumb.size[0] >= int(self.image_size[0] * scale):
+                return thumb
+        
+        image = Image.open(image_path)
+        self.image_size = image.size
+        
+        thumb_path = self._thumbnail_path(image_path)
+        if fit_box is not None and self.zoom_level == 1.0 and thumb_path is not None:
+            # Préférer la miniature si elle suffit pour la taille affichée
+            scale = min(1.0, fit_box[0] / self.image_size[0], fit_box[1] / self.image_size[1])
+            thumb = self._load_image(thumb_path)
+            if thumb.size[0] >= int(self.image_size[0] * scale):
+                image.close()
+                return thumb
+        
+        if (fit_box is not None and self.zoom_level == 1.0
+                and os.path.splitext(image_path)[1].lower() in JPEG_EXTENSIONS):
+            # libjpeg décode directement à 1/2, 1/4 ou 1/8 de la taille
+            image.draft('RGB', (fit_box[0] * 2, fit_box[1] * 2))
+        image.load()
+        
+        if image.size == self.image_size:
+            # Pas de réduction au décodage : c'est déjà l'image complète
+            self.original_image = image
+            self._store_image(image_path, image)
+        return image
+    
+    def _thumbnail_path(self, image_path):
+        thumb_path = os.path.join(os.path.dirname(image_path), THUMBS_DIRNAME, os.path.basename(image_path))
+        return thumb_path if os.path.isfile(thumb_path) else None
+    
+    def _load_image(self, image_path):
+        with self._img_lock:
+            image = self._img_cache.get(image_path)
+            if image is not None:
+                self._img_cache.move_to_end(image_path)
+                return image
+        
+        image = Image.open(image_path)
+        image.load()
+        self._store_image(image_path, image)
+        return image
+    
+    def _store_image(self, image_path, image):
+        with self._img_lock:
+            self._img_cache[image_path] = image
+            self._img_cache.move_to_end(image_path)
+            while len(self._img_cache) > IMAGE_CACHE_SIZE:
+                self._img_cache.popitem(last=False)
+    
+    def _decode_into_cache(self, image_path):
+        try:
+            image = Image.open(image_path)
+            image.load()
+        except Exception:
+            # L'erreur sera affichée si l'utilisateur ouvre réellement l'image
+            return
+        self._store_image(image_path, image)
+    
+    def _warm_thumbs(self, image_paths, generation):
+        # Exécuté dans le thread de décodage : uniquement des images PIL, pas de PhotoImage
+        for image_path in image_paths:
+            with self._img_lock:
+                if generation != self._warm_generation:
+                    return  # une autre année a été chargée entre-temps
+                if image_path in self._thumb_cache:
+                    continue
+            try:
+                with Image.open(image_path) as full_image:
+                    full_size = full_image.size
+                thumb = Image.open(self._thumbnail_path(image_path) or image_path)
+                thumb.draft('RGB', WARM_THUMB_SIZE)
+                thumb.thumbnail(WARM_THUMB_SIZE, Image.Resampling.BILINEAR)
+            except Exception:
+                continue
+            with self._img_lock:
+                if generation != self._warm_generation:
+                    return
+                self._thumb_cache[image_path] = (thumb, full_size)
+    
+    def _prefetch_neighbours(self):
+        # Décoder à l'avance l'image suivante et la précédente
+        for index in (self.current_image_index + 1, self.current_image_index - 1):
+            if 0 <= index < len(self.current_images):
+                image_path = self.current_images[index]
+                image_path = self._thumbnail_path(image_path) or image_path
+                with self._img_lock:
+                    if image_path in self._img_cache:
+                        continue
+                self._decode_pool.submit(self._decode_into_cache, image_path)
+    
+    def apply_zoom(self, resample=None):
+        if self.display_image is None:
             return
+        if resample is None:
+            resample = Image.Resampling.BILINEAR if self._interactive else Image.Resampling.LANCZOS
             
-        # Calculer la nouvelle taille avec le zoom
-        original_width, original_height = self.original_image.size
-        new_width = int(original_width * self.zoom_level)
-        new_height = int(original_height * self.zoom_level)
-        
-        # Redimensionner l'image
-        if self.zoom_level != 1.0:
-            resized_image = self.original_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        else:
-            resized_image = self.original_image
+        # Calculer la taille finale en une fois : zoom, puis ajustement (seulement si zoom = 1.0)
+        original_width, original_height = self.image_size
+        scale = self.zoom_level
+        if self.zoom_level == 1.0:
+            fit_box = self._fit_box()
+            if fit_box is not None:
+                scale = min(1.0, fit_box[0] / original_width, fit_box[1] / original_height)
+        new_width = max(1, int(original_width * scale))
+        new_height = max(1, int(original_height * scale))
         
-        # Choix de la taille selon la sélection (seulement si zoom = 1.0)
+        # Redimensionner l'image en un seul passage, sans jamais modifier la source
         if self.zoom_level == 1.0:
-            size_option = self.size_var.get()
-            if size_option == "Grande":
-                resized_image.thumbnail((1000, 700), Image.Resampling.LANCZOS)
-            elif size_option == "Ajustée":
-                canvas_width = self.canvas.winfo_width() - 20
-                canvas_height = self.canvas.winfo_height() - 20
-                if canvas_width > 1 and canvas_height > 1:
-                    resized_image.thumbnail((canvas_width, canvas_height), Image.Resampling.LANCZOS)
-                else:
-                    resized_image.thumbnail((800, 600), Image.Resampling.LANCZOS)
-        
-        self.photo = ImageTk.PhotoImage(resized_image)
-        
-        # Effacer le canvas et afficher la nouvelle image
-        self.canvas.delete("all")
-        self.image_on_canvas = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
-        
-        # Mettre à jour la zone de défilement
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+            source = self.display_image
+        else:
+            if self.original_image is None:
+                # L'image affichée a été réduite au décodage : relire le fichier en pleine résolution
+                self.original_image = self._load_image(self.current_image_path)
+            source = self.original_image
+        
+        render_key = (new_width, new_height, resample)
+        if source is not self._last_render_source or render_key != self._last_render_key:
+            if source.size == (new_width, new_height):
+                resized_image = source
+            else:
+                resized_image = source.resize((new_width, new_height), resample)
+            
+            self.photo = ImageTk.PhotoImage(resized_image)
+            self._last_render_source = source
+            self._last_render_key = render_key
+        
+        # Réutiliser l'élément image du canvas s'il existe déjà
+        if self.image_on_canvas is not None and self.canvas.type(self.image_on_canvas) == "image":
+            self.canvas.itemconfigure(self.image_on_canvas, image=self.photo)
+            self.canvas.coords(self.image_on_canvas, 0, 0)
+        else:
+            # Effacer un éventuel message et créer l'image
+            self.canvas.delete("all")
+            self.image_on_canvas = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+        
+        # Mettre à jour la zone de défilement (taille connue, pas besoin de bbox)
+        self.canvas.configure(scrollregion=(0, 0, self.photo.width(), self.photo.height()))
         
         # Mettre à jour l'affichage du zoom
         zoom_percent = int(self.zoom_level * 100)
@@ -185,6 +389,7 @@ class ImageViewer:
     def previous_image(self):
         if self.current_image_index > 0:
             self.current_image_index -= 1
+            self._cancel_pending_zoom()
             self.zoom_level = 1.0  # Reset zoom when changing image
             self.display_current_image()
             self.update_navigation_buttons()
@@ -192,6 +397,7 @@ class ImageViewer:
     def next_image(self):
         if self.current_image_index < len(self.current_images) - 1:
             self.current_image_index += 1
+            self._cancel_pending_zoom()
             self.zoom_level = 1.0 
             self.display_current_image()
             self.update_navigation_buttons()
@@ -201,6 +407,7 @@ class ImageViewer:
         self.load_images_for_year()
     
     def on_size_change(self, event):
+        self._cancel_pending_zoom()
         self.zoom_level = 1.0  # Reset zoom when changing size option
         self.display_current_image()
     
@@ -214,10 +421,47 @@ class ImageViewer:
         else:
             return
         
-        new_zoom = self.zoom_level * zoom_factor
+        current_zoom = self._pending_zoom if self._pending_zoom is not None else self.zoom_level
+        new_zoom = current_zoom * zoom_factor
         if 0.1 <= new_zoom <= 10.0:
-            self.zoom_level = new_zoom
-            self.apply_zoom()
+            self._pending_zoom = new_zoom
+            self._interactive = True
+            if self._finalize_after is not None:
+                self.root.after_cancel(self._finalize_after)
+            self._finalize_after = self.root.after(150, self._finalize_zoom)
+            if self._zoom_after is None:
+                self._zoom_after = self.root.after(16, self._flush_zoom)
+    
+    def _flush_zoom(self):
+        self._zoom_after = None
+        if self._pending_zoom is None:
+            return
+        self.zoom_level = self._pending_zoom
+        self._pending_zoom = None
+        self.apply_zoom()
+    
+    def _finalize_zoom(self):
+        # Fin du geste : refaire le rendu en haute qualité
+        self._finalize_after = None
+        self._interactive = False
+        if self._zoom_after is not None:
+            self.root.after_cancel(self._zoom_after)
+            self._zoom_after = None
+        if self._pending_zoom is not None:
+            self.zoom_level = self._pending_zoom
+            self._pending_zoom = None
+        self.apply_zoom()
+    
+    def _cancel_pending_zoom(self):
+        # Oublier un geste de molette en cours : il ne doit pas s'appliquer à l'image suivante
+        if self._zoom_after is not None:
+            self.root.after_cancel(self._zoom_after)
+            self._zoom_after = None
+        if self._finalize_after is not None:
+            self.root.after_cancel(self._finalize_after)
+            self._finalize_after = None
+        self._pending_zoom = None
+        self._interactive = False
     
     def on_button_press(self, event):
         
@@ -234,10 +478,17 @@ class ImageViewer:
         self.start_y = event.y
     
     def reset_zoom(self, event=None):
+        self._cancel_pending_zoom()
         self.zoom_level = 1.0
         self.apply_zoom()
         self.canvas.xview_moveto(0)
         self.canvas.yview_moveto(0)
+    
+    def on_close(self):
+        self._cancel_pending_zoom()
+        # Abandonner les décodages en attente : inutile de les finir une fois la fenêtre fermée
+        self._decode_pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
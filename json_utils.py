@@ -0,0 +1,43 @@
+# json_utils.py
+
+import json
+import os
+from pathlib import Path
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson est optionnel : repli sur le module standard
+    _json_loads = json.loads
+
+try:
+    import ijson
+    # Uniquement le backend C : le backend Python pur est plus lent qu'un chargement complet
+    _ijson_items = ijson.get_backend('yajl2_c').items
+except ImportError:  # ijson est optionnel : repli sur un chargement complet du document
+    _ijson_items = None
+
+
+def scan_json(root):
+    """Recursively yield the DirEntry of every JSON file under root."""
+    # DirEntry garde le type d'entrée en cache : pas de stat() par fichier comme avec rglob
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_json(entry.path)
+            elif entry.name.endswith(".json") and entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def load_json(json_file: Path):
+    """Load a whole JSON file (with orjson when available)."""
+    return _json_loads(json_file.read_bytes())
+
+
+def iter_pages(json_file: Path):
+    """Yield the pages of a result JSON file one at a time (streamed when ijson is available)."""
+    if _ijson_items is not None:
+        with open(json_file, "rb") as f:
+            yield from _ijson_items(f, "item", use_float=True)
+    else:
+        yield from load_json(json_file)
@@ -1,12 +1,23 @@
 import os
-import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+import matplotlib.patheffects as patheffects
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import numpy as np
+from PIL import Image
 from typing import Dict, List, Tuple, Any, Optional
 from dataclasses import dataclass
 from pathlib import Path
-from column_detector import LayoutAnalyzer, ColumnDetector, Layout, TextBox
+from column_detector import LayoutAnalyzer, ColumnDetector, Layout
+from json_utils import load_json
+from render_utils import PngWriter, box_outlines, init_worker, process_file, save_thumbnail
+
+# Liseré blanc autour des étiquettes : dessiné avec le texte, sans patch de fond séparé
+LABEL_HALO = [patheffects.withStroke(linewidth=2, foreground='white')]
 
 @dataclass
 class VisualizationConfig:
@@ -17,6 +28,11 @@ class VisualizationConfig:
     text_box_line_width: float = 1.0
     padding: int = 50
     grid_alpha: float = 0.3
+    dpi: int = 100
+    png_compress_level: int = 1  # zlib level: 1 encodes much faster than the default 6
+    thumbnail_size: Optional[Tuple[int, int]] = (1600, 1200)  # None disables thumbs/
+    max_text_previews: int = 50  # denser layouts only get index labels
+    max_text_labels: int = 100  # denser layouts get no text box labels at all
     
 @dataclass
 class ColorScheme:
@@ -36,14 +52,19 @@ class ProcessingStats:
 class PageVisualizer:
     """Class for visualizing page layouts and their text boxes."""
     
+    # Text box palette, computed once for all pages and instances
+    TEXT_BOX_COLORS: np.ndarray = plt.cm.Blues(np.linspace(0.3, 0.8, 20))
+    
     def __init__(self, config: Optional[VisualizationConfig] = None, 
                  color_scheme: Optional[ColorScheme] = None):
         self.config = config or VisualizationConfig()
         self.colors = color_scheme or ColorScheme()
         self.column_detector = ColumnDetector()
+        self._legend_elements = self._build_legend_elements()
         
     def visualize_page_layouts(self, page_data: Dict[str, Any], 
-                             enhanced_layouts: List[int]) -> plt.Figure:
+                             enhanced_layouts: List[int],
+                             ax: Optional[plt.Axes] = None) -> plt.Figure:
         """
         Visualize all layouts and their text boxes in a single figure,
         highlighting layouts detected by the enhanced algorithm.
@@ -51,19 +72,28 @@ class PageVisualizer:
         Args:
             page_data: A page dictionary containing layout information
             enhanced_layouts: Indices of layouts detected by the enhanced algorithm
+            ax: Existing axis to clear and draw into (reuses its figure)
         
         Returns:
             matplotlib figure object
         """
-        # Create figure and axis
-        fig, ax = plt.subplots(figsize=self.config.figsize)
+        # Create figure and axis, or reuse the given ones
+        if ax is None:
+            fig, ax = plt.subplots(figsize=self.config.figsize)
+        else:
+            ax.clear()
+            fig = ax.figure
+        
+        # Layout boxes as one (N, 4) array, shared by the framing and the drawing
+        layout_bboxes = np.asarray([layout_data['bbox_layout'] for layout_data in page_data['page']],
+                                   dtype=np.float64)
         
         # Calculate overall document dimensions
-        x_coords, y_coords = self._get_document_dimensions(page_data)
+        x_min, y_min, x_max, y_max = self._get_document_dimensions(layout_bboxes)
         
         # Add some padding
-        x_min, x_max = min(x_coords) - self.config.padding, max(x_coords) + self.config.padding
-        y_min, y_max = min(y_coords) - self.config.padding, max(y_coords) + self.config.padding
+        x_min, x_max = x_min - self.config.padding, x_max + self.config.padding
+        y_min, y_max = y_min - self.config.padding, y_max + self.config.padding
         
         # Set axis limits
         ax.set_xlim(x_min, x_max)
@@ -72,11 +102,8 @@ class PageVisualizer:
         # Set title
         ax.set_title(f"Page {page_data['index']} - Enhanced Layout Detection", fontsize=16)
         
-        # Prepare color palette for text boxes
-        text_box_colors = plt.cm.Blues(np.linspace(0.3, 0.8, 20))
-        
         # Draw each layout and its text boxes
-        self._draw_layouts(ax, page_data, enhanced_layouts, text_box_colors)
+        self._draw_layouts(ax, page_data, layout_bboxes, enhanced_layouts, self.TEXT_BOX_COLORS)
         
         # Add grid for reference
         ax.grid(True, linestyle='--', alpha=self.config.grid_alpha)
@@ -88,22 +115,36 @@ class PageVisualizer:
         ax.set_xlabel('X coordinate', fontsize=12)
         ax.set_ylabel('Y coordinate', fontsize=12)
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
     
-    def _get_document_dimensions(self, page_data: Dict[str, Any]) -> Tuple[List[float], List[float]]:
-        """Calculate overall document dimensions."""
-        x_coords = []
-        y_coords = []
-        for layout in page_data['page']:
-            x_coords.extend([layout['bbox_layout'][0], layout['bbox_layout'][2]])
-            y_coords.extend([layout['bbox_layout'][1], layout['bbox_layout'][3]])
-        return x_coords, y_coords
+    def _get_document_dimensions(self, bboxes: np.ndarray) -> Tuple[float, float, float, float]:
+        """Calculate overall document extent as (x_min, y_min, x_max, y_max) from (N, 4) layout boxes."""
+        x_coords = bboxes[:, [0, 2]]
+        y_coords = bboxes[:, [1, 3]]
+        return x_coords.min(), y_coords.min(), x_coords.max(), y_coords.max()
     
-    def _draw_layouts(self, ax: plt.Axes, page_data: Dict[str, Any], 
+    def _draw_layouts(self, ax: plt.Axes, page_data: Dict[str, Any], layout_bboxes: np.ndarray,
                      enhanced_layouts: List[int], text_box_colors: np.ndarray) -> None:
         """Draw each layout and its text boxes."""
-        for layout_idx, layout_data in enumerate(page_data['page']):
+        layouts = page_data['page']
+        
+        # Layout geometry for the whole page at once
+        widths = layout_bboxes[:, 2] - layout_bboxes[:, 0]
+        heights = layout_bboxes[:, 3] - layout_bboxes[:, 1]
+        is_text = np.fromiter((layout_data.get('label', '') == 'Text' for layout_data in layouts),
+                              dtype=bool, count=len(layouts))
+        large_text_flags = (is_text & (widths > 900) & (heights > 800)).tolist()
+        enhanced_set = set(enhanced_layouts)
+        
+        # Layout rectangles and text box rectangles are gathered during the loop
+        # and drawn as one collection each (limits are already set: no autolim)
+        layout_edge_colors: List[str] = []
+        layout_line_widths: List[float] = []
+        text_rects: List[np.ndarray] = []
+        text_rect_colors: List[np.ndarray] = []
+        
+        for layout_idx, layout_data in enumerate(layouts):
             layout = Layout(
                 bbox_layout=layout_data['bbox_layout'],
                 label=layout_data.get('label', ''),
@@ -112,29 +153,43 @@ class PageVisualizer:
             )
             
             # Check if this layout was detected by enhanced algorithm
-            is_enhanced_detected = layout_idx in enhanced_layouts
+            is_enhanced_detected = layout_idx in enhanced_set
             
             # Determine layout characteristics
-            layout_info = self._analyze_layout(layout, layout_data)
+            layout_info = self._analyze_layout(layout, layout_data, large_text_flags[layout_idx])
             
             # Draw layout rectangle
-            self._draw_layout_rectangle(ax, layout, layout_info, is_enhanced_detected, layout_idx)
+            self._draw_layout_rectangle(ax, layout, layout_info, is_enhanced_detected, layout_idx,
+                                        layout_edge_colors, layout_line_widths)
             
             # Draw text boxes if they exist
             if layout.bbox_text and layout.text:
-                self._draw_text_boxes(ax, layout, text_box_colors, layout_idx)
-    
-    def _analyze_layout(self, layout: Layout, layout_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze layout characteristics."""
-        is_large_text_layout = (
-            layout.label == 'Text' and 
-            layout.width > 900 and 
-            layout.height > 800
-        )
+                self._draw_text_boxes(ax, layout, text_box_colors, layout_idx,
+                                      text_rects, text_rect_colors)
         
+        if layouts:
+            ax.add_collection(LineCollection(
+                box_outlines(layout_bboxes),
+                colors=layout_edge_colors,
+                linewidths=layout_line_widths,
+                alpha=self.colors.text_box_alpha
+            ), autolim=False)
+        
+        if text_rects:
+            ax.add_collection(LineCollection(
+                np.concatenate(text_rects),
+                colors=np.concatenate(text_rect_colors),
+                linewidths=self.config.text_box_line_width,
+                alpha=self.colors.text_box_alpha,
+                rasterized=True
+            ), autolim=False)
+    
+    def _analyze_layout(self, layout: Layout, layout_data: Dict[str, Any],
+                        is_large_text_layout: bool) -> Dict[str, Any]:
+        """Analyze layout characteristics (the size check is precomputed per page)."""
         is_two_column = False
         if layout.label == 'Text' and layout.bbox_text:
-            is_two_column = self.column_detector.detect_two_column_layout(layout_data)
+            is_two_column = self.column_detector.detect_in_layout(layout)
         
         return {
             'is_large_text_layout': is_large_text_layout,
@@ -143,9 +198,11 @@ class PageVisualizer:
     
     def _draw_layout_rectangle(self, ax: plt.Axes, layout: Layout, 
                               layout_info: Dict[str, Any], is_enhanced_detected: bool, 
-                              layout_idx: int) -> None:
-        """Draw layout rectangle with appropriate styling."""
-        x_start, y_start, x_end, y_end = layout.bbox_layout
+                              layout_idx: int,
+                              layout_edge_colors: List[str],
+                              layout_line_widths: List[float]) -> None:
+        """Draw the layout label and collect the layout rectangle styling."""
+        x_start, y_start = layout.bbox_layout[0], layout.bbox_layout[1]
         
         # Set layout box style based on detection
         layout_line_width = (self.config.layout_line_width_detected if is_enhanced_detected 
@@ -158,15 +215,9 @@ class PageVisualizer:
         else:
             layout_edge_color = self.colors.regular_layout
         
-        # Draw layout rectangle
-        layout_rect = patches.Rectangle(
-            (x_start, y_start), layout.width, layout.height,
-            linewidth=layout_line_width, 
-            edgecolor=layout_edge_color,  
-            facecolor='none', 
-            alpha=self.colors.text_box_alpha
-        )
-        ax.add_patch(layout_rect)
+        # Layout rectangle style (drawn later by _draw_layouts)
+        layout_edge_colors.append(layout_edge_color)
+        layout_line_widths.append(layout_line_width)
         
         # Add layout label
         self._add_layout_label(ax, layout, layout_info, layout_idx, x_start, y_start)
@@ -186,50 +237,55 @@ class PageVisualizer:
             f"Layout {layout_idx}: {layout.label}{detection_info}", 
             color='black', 
             fontsize=9, 
-            bbox=dict(facecolor='white', alpha=0.8, edgecolor='none', pad=1)
+            path_effects=LABEL_HALO
         )
     
     def _draw_text_boxes(self, ax: plt.Axes, layout: Layout, 
-                        text_box_colors: np.ndarray, layout_idx: int) -> None:
-        """Draw text boxes within a layout."""
-        for text_idx, (bbox, text) in enumerate(zip(layout.bbox_text, layout.text)):
-            text_box = TextBox(*bbox, text)
-            
-            # Cycle through text box colors
-            text_color = text_box_colors[text_idx % len(text_box_colors)]
-            
-            # Text box rectangle
-            text_rect = patches.Rectangle(
-                (text_box.x_start, text_box.y_start), text_box.width, text_box.height,
-                linewidth=self.config.text_box_line_width, 
-                edgecolor=text_color, 
-                facecolor='none', 
-                alpha=self.colors.text_box_alpha
-            )
-            ax.add_patch(text_rect)
-            
-            # Add text index label
-            ax.text(
-                text_box.x_start + 2, text_box.y_start + 10, 
-                f"L{layout_idx}-T{text_idx}", 
-                color='black', 
-                fontsize=7, 
-                bbox=dict(facecolor='white', alpha=0.6, edgecolor='none', pad=1)
-            )
-            
-            # Add text preview
-            text_preview = text[:15] + "..." if len(text) > 15 else text
+                        text_box_colors: np.ndarray, layout_idx: int,
+                        text_rects: List[np.ndarray],
+                        text_rect_colors: List[np.ndarray]) -> None:
+        """Draw text box labels and collect the text box rectangles."""
+        num_boxes = min(len(layout.bbox_text), len(layout.text))
+        boxes = layout.boxes_arr[:num_boxes]
+        
+        # Text box rectangles as corner arrays (drawn later by _draw_layouts)
+        text_rects.append(box_outlines(boxes))
+        x_start, y_start = boxes[:, 0], boxes[:, 1]
+        
+        # Cycle through text box colors
+        text_rect_colors.append(text_box_colors[np.arange(num_boxes) % len(text_box_colors)])
+        
+        # Labels would only pile up on very dense layouts: rectangles only
+        if num_boxes > self.config.max_text_labels:
+            return
+        
+        # Label positions, computed for the whole layout at once
+        label_x = (x_start + 2).tolist()
+        label_y = (y_start + 1).tolist()
+        
+        # One label per text box: index line, then the preview line.
+        # Previews are unreadable on dense layouts, so only the index is drawn there
+        if num_boxes > self.config.max_text_previews:
+            labels = [f"L{layout_idx}-T{text_idx}" for text_idx in range(num_boxes)]
+        else:
+            labels = [
+                f"L{layout_idx}-T{text_idx}\n{text[:15] + '...' if len(text) > 15 else text}"
+                for text_idx, text in enumerate(layout.text[:num_boxes])
+            ]
+        
+        for text_idx, label in enumerate(labels):
             ax.text(
-                text_box.x_start + 2, text_box.y_start + 20, 
-                text_preview, 
+                label_x[text_idx], label_y[text_idx], 
+                label, 
                 color='black', 
                 fontsize=6, 
-                bbox=dict(facecolor='white', alpha=0.5, edgecolor='none', pad=1)
+                verticalalignment='top',
+                path_effects=LABEL_HALO
             )
     
-    def _add_legend(self, ax: plt.Axes) -> None:
-        """Add legend for layout types."""
-        legend_elements = [
+    def _build_legend_elements(self) -> List[patches.Patch]:
+        """Build the legend handles for the layout types of this color scheme."""
+        return [
             patches.Patch(edgecolor=self.colors.large_text_layout, facecolor='none', 
                          label='Large Text Layout'),
             patches.Patch(edgecolor=self.colors.two_column_layout, facecolor='none', 
@@ -237,17 +293,27 @@ class PageVisualizer:
             patches.Patch(edgecolor=self.colors.regular_layout, facecolor='none', 
                          label='Regular Layout')
         ]
-        ax.legend(handles=legend_elements, loc='upper right')
+    
+    def _add_legend(self, ax: plt.Axes) -> None:
+        """Add legend for layout types."""
+        ax.legend(handles=self._legend_elements, loc='upper right')
 
 class DocumentProcessor:
     """Class for processing documents and generating visualizations."""
     
-    def __init__(self, base_dir: str = "result_json", output_dir: str = "visualization_output"):
+    def __init__(self, base_dir: str = "result_json", output_dir: str = "visualization_output",
+                 max_workers: Optional[int] = None):
         self.base_dir = Path(base_dir)
         self.output_dir = Path(output_dir)
+        self.max_workers = max_workers or os.cpu_count() or 1
         self.layout_analyzer = LayoutAnalyzer()
         self.visualizer = PageVisualizer()
         self.stats = ProcessingStats()
+        # Figure réutilisée d'une page à l'autre en mode batch
+        self._batch_ax: Optional[plt.Axes] = None
+        # Fenêtre réutilisée d'une page à l'autre en modes interactif et combiné
+        self._interactive_ax: Optional[plt.Axes] = None
+        self._png_writer = PngWriter(self.visualizer.config.png_compress_level)
     
     def process_documents(self, mode: int = 1) -> None:
         """
@@ -265,13 +331,38 @@ class DocumentProcessor:
         self.output_dir.mkdir(exist_ok=True)
         
         # Process each year folder
-        for year_dir in sorted(self.base_dir.iterdir(), reverse=True):
-            if year_dir.is_dir() and year_dir.name > "1964":
+        year_dirs = self._list_year_dirs()
+        
+        if mode == 2 and self.max_workers > 1:
+            # Batch mode only saves files: spread them over worker processes
+            self._process_years_parallel(year_dirs)
+        else:
+            # plt.show must stay on the main thread
+            for year_dir in year_dirs:
                 self._process_year(year_dir, mode)
         
+        # The batch figure is not registered with pyplot: dropping it is enough
+        self._batch_ax = None
+        if self._interactive_ax is not None:
+            plt.close(self._interactive_ax.figure)
+            self._interactive_ax = None
+        
         # Print summary statistics
         self._print_statistics()
     
+    def _list_year_dirs(self) -> List[Path]:
+        """List year directories, most recent first."""
+        # os.scandir renvoie le type d'entrée sans stat supplémentaire
+        with os.scandir(self.base_dir) as entries:
+            year_paths = [entry.path for entry in entries if entry.is_dir() and entry.name > "1964"]
+        return [Path(path) for path in sorted(year_paths, reverse=True)]
+    
+    def _list_json_files(self, year_dir: Path) -> List[Path]:
+        """List the JSON files of a year directory in name order."""
+        with os.scandir(year_dir) as entries:
+            json_paths = [entry.path for entry in entries if entry.name.endswith(".json") and entry.is_file()]
+        return [Path(path) for path in sorted(json_paths)]
+    
     def _process_year(self, year_dir: Path, mode: int) -> None:
         """Process a single year directory."""
         print(f"Processing year: {year_dir.name}")
@@ -281,26 +372,48 @@ class DocumentProcessor:
         year_output_dir.mkdir(exist_ok=True)
         
         # Process each JSON file in the year folder
-        for json_file in sorted(year_dir.glob("*.json")):
+        for json_file in self._list_json_files(year_dir):
             self._process_json_file(json_file, year_output_dir, mode)
     
+    def _process_years_parallel(self, year_dirs: List[Path]) -> None:
+        """Process every JSON file of the given years in batch mode with a process pool."""
+        tasks = []
+        for year_dir in year_dirs:
+            print(f"Processing year: {year_dir.name}")
+            year_output_dir = self.output_dir / year_dir.name
+            year_output_dir.mkdir(exist_ok=True)
+            tasks.extend((str(json_file), str(year_output_dir)) for json_file in self._list_json_files(year_dir))
+        
+        if not tasks:
+            return
+        
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks)),
+                                 initializer=init_worker,
+                                 initargs=(partial(DocumentProcessor, str(self.base_dir), str(self.output_dir),
+                                                   max_workers=1),)) as pool:
+            for file_stats in pool.map(process_file, tasks):
+                self.stats.total_files += file_stats.total_files
+                self.stats.total_pages += file_stats.total_pages
+                self.stats.total_layouts += file_stats.total_layouts
+    
     def _process_json_file(self, json_file: Path, year_output_dir: Path, mode: int) -> None:
         """Process a single JSON file."""
         print(f"Processing file: {json_file.name}")
         self.stats.total_files += 1
         
         # Read the JSON file
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = load_json(json_file)
         
         # Process each page
         pages_with_layouts = []
         pages_without_detection = []  # New: track pages without detection
         
-        for page_num, page in enumerate(data):
+        # Detection pass over the whole document before any rendering
+        # (enhanced layout detection algorithm, batched across pages)
+        layout_peeks = self.layout_analyzer.enhanced_layout_peeks(data)
+        
+        for page, layout_peek in zip(data, layout_peeks):
             self.stats.total_pages += 1
-            # Use enhanced layout detection algorithm
-            layout_peek = self.layout_analyzer.enhanced_layout_peek(page)
             
             if layout_peek:
                 self.stats.total_layouts += len(layout_peek)
@@ -319,6 +432,16 @@ class DocumentProcessor:
         # New: Generate visualizations for non-detected but valid pages (only in batch mode)
         if pages_without_detection and mode == 2:
             self._generate_visualizations(pages_without_detection, json_file, year_output_dir, mode, detected=False)
+        
+        # Every image of this file is on disk once the method returns
+        self._png_writer.flush()
+    
+    def process_file_task(self, task: Tuple[str, str]) -> ProcessingStats:
+        """Process one JSON file in batch mode (process pool task) and return its statistics."""
+        json_file, year_output_dir = task
+        self.stats = ProcessingStats()
+        self._process_json_file(Path(json_file), Path(year_output_dir), mode=2)
+        return self.stats
     
     def _generate_visualizations(self, pages_with_layouts: List[Tuple[Dict[str, Any], List[int]]], 
                                json_file: Path, year_output_dir: Path, mode: int, detected: bool = True) -> None:
@@ -330,25 +453,61 @@ class DocumentProcessor:
             save_path = year_output_dir / f"{base_filename}_page{page['index']}{detection_suffix}.png"
             
             # Visualize all layouts and their text boxes in one figure
-            fig = self.visualizer.visualize_page_layouts(page, layout_peek)
+            # (every mode redraws into the same figure instead of creating one per page)
+            ax = self._get_batch_axis() if mode == 2 else self._get_interactive_axis()
+            fig = self.visualizer.visualize_page_layouts(page, layout_peek, ax=ax)
             
             if mode == 1 or mode == 3:  # Interactive or Combined mode
-                plt.show(block=False)  # Non-blocking to prevent freezing in batch processing
-                plt.pause(0.1)  # Short pause to render the figure
+                fig.show()  # Non-blocking to prevent freezing in batch processing
+                # Schedule a redraw and let the GUI process it, without pause()'s fixed sleep
+                fig.canvas.draw_idle()
+                fig.canvas.flush_events()
                 
                 if mode == 1:  # Interactive mode only
-                    # Wait for user to press a key before continuing
-                    input("Press Enter to continue to next visualization...")
-                    plt.close(fig)
+                    # Wait for a key press or click in the figure (GUI events keep being processed)
+                    print("Press a key or click in the figure to continue to next visualization...")
+                    fig.waitforbuttonpress()
             
             if mode == 2 or mode == 3:  # Batch or Combined mode
                 # Save figure to file
-                fig.savefig(save_path, dpi=150, bbox_inches='tight')
+                thumb_path = None
+                if self.visualizer.config.thumbnail_size is not None:
+                    thumb_path = year_output_dir / "thumbs" / save_path.name
+                self._save_figure(fig, save_path, thumb_path)
                 detection_type = "detected" if detected else "not detected"
                 print(f"Saved {detection_type} visualization to {save_path}")
-            
-            if mode != 1:  # Close figure if not in interactive mode
-                plt.close(fig)
+    
+    def _save_figure(self, fig: Figure, save_path: Path, thumb_path: Optional[Path]) -> None:
+        """Render a figure once and write it (and its thumbnail) as PNG."""
+        config = self.visualizer.config
+        if self._batch_ax is None or fig is not self._batch_ax.figure:
+            # Interactive window (mode 3): its canvas belongs to the GUI backend and may be at
+            # screen dpi, so let savefig render a separate image at the output dpi
+            fig.savefig(save_path, dpi=config.dpi,
+                        pil_kwargs={'optimize': False, 'compress_level': config.png_compress_level})
+            if thumb_path is not None:
+                with Image.open(save_path) as image:
+                    save_thumbnail(image, thumb_path, config.thumbnail_size, config.png_compress_level)
+            return
+        # Batch figure is already at the output dpi: draw once and let the writer thread encode it
+        self._png_writer.save(fig, save_path, thumb_path, config.thumbnail_size)
+    
+    def _get_interactive_axis(self) -> plt.Axes:
+        """Return the axis of the window reused for every page in modes 1 and 3."""
+        # A new window is opened only if the user closed the previous one
+        if self._interactive_ax is None or not plt.fignum_exists(self._interactive_ax.figure.number):
+            _, self._interactive_ax = plt.subplots(figsize=self.visualizer.config.figsize)
+        return self._interactive_ax
+    
+    def _get_batch_axis(self) -> plt.Axes:
+        """Return the axis reused for every page in batch mode."""
+        if self._batch_ax is None:
+            # Agg figure created outside pyplot: no GUI backend, no figure manager
+            config = self.visualizer.config
+            fig = Figure(figsize=config.figsize, dpi=config.dpi)
+            FigureCanvasAgg(fig)
+            self._batch_ax = fig.subplots()
+        return self._batch_ax
     
     def _print_statistics(self) -> None:
         """Print processing statistics."""
@@ -361,7 +520,7 @@ class DocumentProcessor:
     def get_visualization_mode(self) -> int:
         """Get visualization mode from user input."""
         print("\nVisualization Options:")
-        print("1. Interactive mode (show one window at a time, press close to continue)")
+        print("1. Interactive mode (show one window at a time, press a key in the window to continue)")
         print("2. Batch mode (save all visualizations as PNG files - includes detected and not detected)")
         print("3. Combined mode (show visualizations and save as PNG files)")
         
@@ -1,72 +1,90 @@
 # multi_layout_visualizer.py
 
-import json
-import matplotlib.pyplot as plt
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 import matplotlib.patches as patches
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 
 # Importation du nouveau détecteur avec la nouvelle logique
 from row_detector import RowDetector
+from json_utils import load_json, scan_json
+from render_utils import PngWriter, box_outlines, init_worker, page_figure, process_file
+
 
 @dataclass
 class VisualizationConfig:
     figsize: Tuple[int, int] = (20, 25)
     layout_line_width: float = 2.0
     padding: int = 50
+    dpi: int = 100
+    png_compress_level: int = 1  # zlib rapide (défaut PNG : 6)
 
 @dataclass
 class ColorScheme:
     detected_layout: str = 'orange' 
     text_box_alpha: float = 0.8
 
+# Nombre de fichiers lus et analysés d'avance pendant le rendu (mode séquentiel)
+READ_AHEAD_FILES = 8
+
 class PageVisualizer:
     def __init__(self, config: Optional[VisualizationConfig] = None, color_scheme: Optional[ColorScheme] = None):
         self.config = config or VisualizationConfig()
         self.colors = color_scheme or ColorScheme()
+        # Une seule figure Agg, vidée et redessinée pour chaque page
+        self._fig, self._ax = page_figure(self.config.figsize, self.config.dpi)
+        # Légende construite une fois pour le jeu de couleurs
+        self._legend_elements = [
+            patches.Patch(edgecolor=self.colors.detected_layout, facecolor='none', label='Detected Page'),
+        ]
 
     # La méthode est simplifiée : elle ne visualise qu'une page DÉTECTÉE
-    def visualize_detected_page(self, page_data: Dict[str, Any]) -> plt.Figure:
-        fig, ax = plt.subplots(figsize=self.config.figsize)
+    def visualize_detected_page(self, page_data: Dict[str, Any], boxes: Optional[np.ndarray] = None) -> Figure:
+        """boxes : tableau (N, 4) des bbox_layout de la page, s'il est déjà calculé."""
+        fig, ax = self._fig, self._ax
+        ax.cla()
         
-        all_bboxes = [layout['bbox_layout'] for layout in page_data['page']]
-        x_coords = [bbox[0] for bbox in all_bboxes] + [bbox[2] for bbox in all_bboxes]
-        y_coords = [bbox[1] for bbox in all_bboxes] + [bbox[3] for bbox in all_bboxes]
+        if boxes is None:
+            boxes = np.asarray([layout['bbox_layout'] for layout in page_data['page']], dtype=np.float64)
+        x_coords = boxes[:, [0, 2]]
+        y_coords = boxes[:, [1, 3]]
         
-        ax.set_xlim(min(x_coords) - self.config.padding, max(x_coords) + self.config.padding)
-        ax.set_ylim(max(y_coords) + self.config.padding, min(y_coords) - self.config.padding)
+        ax.set_xlim(x_coords.min() - self.config.padding, x_coords.max() + self.config.padding)
+        ax.set_ylim(y_coords.max() + self.config.padding, y_coords.min() - self.config.padding)
         ax.set_title(f"Page {page_data['index']} - Horizontal Layout Case Detected", fontsize=16)
 
         # Puisque cette méthode n'est appelée que pour les pages détectées, tous les layouts sont colorés
-        for idx, layout_data in enumerate(page_data['page']):
-            bbox = layout_data['bbox_layout']
-            width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
-            
-            rect = patches.Rectangle(
-                (bbox[0], bbox[1]), width, height,
-                linewidth=self.config.layout_line_width,
-                edgecolor=self.colors.detected_layout,
-                facecolor='none',
-                alpha=self.colors.text_box_alpha
-            )
-            ax.add_patch(rect)
-            ax.text(bbox[0], bbox[1] - 5, f"Layout {idx}", fontsize=8, color=self.colors.detected_layout)
+        # Tous les contours en une seule collection
+        ax.add_collection(LineCollection(
+            box_outlines(boxes),
+            linewidths=self.config.layout_line_width,
+            colors=self.colors.detected_layout,
+            alpha=self.colors.text_box_alpha
+        ), autolim=False)  # limites déjà fixées ci-dessus
+        for idx, (x_start, y_start) in enumerate(boxes[:, :2].tolist()):
+            ax.text(x_start, y_start - 5, f"Layout {idx}", fontsize=8, color=self.colors.detected_layout)
 
         ax.grid(True, linestyle='--')
-        legend_elements = [
-            patches.Patch(edgecolor=self.colors.detected_layout, facecolor='none', label='Detected Page'),
-        ]
-        ax.legend(handles=legend_elements, loc='upper right')
+        ax.legend(handles=self._legend_elements, loc='upper right')
         
         return fig
 
 class DocumentProcessor:
-    def __init__(self, base_dir: str = "result_json", output_dir: str = "horizontal_output_scanline"):
+    def __init__(self, base_dir: str = "result_json", output_dir: str = "horizontal_output_scanline",
+                 max_workers: Optional[int] = None):
         self.base_dir = Path(base_dir)
         self.output_dir = Path(output_dir)
+        self.max_workers = max_workers or os.cpu_count() or 1
         self.row_detector = RowDetector() # Utilise la nouvelle version
         self.visualizer = PageVisualizer()
+        self._png_writer = PngWriter(self.visualizer.config.png_compress_level)
 
     def process_documents(self):
         if not self.base_dir.exists():
@@ -76,29 +94,63 @@ class DocumentProcessor:
         self.output_dir.mkdir(exist_ok=True)
         print("Début du traitement avec l'algorithme de balayage...")
         
-        for json_file in sorted(self.base_dir.rglob("*.json")):
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            for page_data in data:
-                # La fonction de détection retourne maintenant un simple booléen
-                is_complex_page = self.row_detector.detect_multi_layout_rows_on_page(page_data)
-                
-                if is_complex_page:
-                    print(f"  Détection sur {json_file.name}, Page {page_data['index']}.")
-                    
-                    # La méthode de visualisation n'a plus besoin des indices
-                    fig = self.visualizer.visualize_detected_page(page_data)
-                    
-                    year_dir = self.output_dir / json_file.parent.name
-                    year_dir.mkdir(exist_ok=True)
-                    save_path = year_dir / f"{json_file.stem}_page{page_data['index']}_detected.png"
-                    
-                    fig.savefig(save_path, dpi=150, bbox_inches='tight')
-                    plt.close(fig)
+        json_files = [Path(path) for path in sorted(entry.path for entry in scan_json(self.base_dir))]
+        if self.max_workers > 1 and len(json_files) > 1:
+            # Les fichiers sont indépendants : on les répartit sur plusieurs processus
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(json_files)),
+                                     initializer=init_worker,
+                                     initargs=(partial(DocumentProcessor, str(self.base_dir), str(self.output_dir),
+                                                       max_workers=1),)) as pool:
+                list(pool.map(process_file, [str(json_file) for json_file in json_files]))
+        else:
+            # Lecture + détection dans un thread, rendu dans le thread principal :
+            # au plus READ_AHEAD_FILES fichiers chargés d'avance
+            with ThreadPoolExecutor(max_workers=1) as reader:
+                pending = deque()
+                for json_file in json_files:
+                    pending.append(reader.submit(self._load_and_detect, json_file))
+                    if len(pending) > READ_AHEAD_FILES:
+                        self._render_detected_pages(*pending.popleft().result())
+                while pending:
+                    self._render_detected_pages(*pending.popleft().result())
 
         print("Traitement terminé.")
 
+    def _process_json_file(self, json_file: Path):
+        self._render_detected_pages(*self._load_and_detect(json_file))
+
+    def process_file_task(self, json_file: str):
+        """Tâche du pool de processus : un fichier JSON."""
+        self._process_json_file(Path(json_file))
+
+    def _load_and_detect(self, json_file: Path) -> Tuple[Path, List[Tuple[Dict[str, Any], np.ndarray]]]:
+        """Lit un fichier et renvoie les pages détectées avec leurs boîtes (sans rien dessiner)."""
+        data = load_json(json_file)
+        detected_pages = []
+        for page_data in data:
+            # Boîtes des layouts extraites une seule fois, pour la détection puis le dessin
+            boxes = np.asarray([layout['bbox_layout'] for layout in page_data.get('page', [])], dtype=np.float64)
+            # La fonction de détection retourne maintenant un simple booléen
+            if self.row_detector.detect_multi_layout_rows_on_page(page_data, boxes):
+                detected_pages.append((page_data, boxes))
+        return json_file, detected_pages
+
+    def _render_detected_pages(self, json_file: Path, detected_pages: List[Tuple[Dict[str, Any], np.ndarray]]):
+        for page_data, boxes in detected_pages:
+            print(f"  Détection sur {json_file.name}, Page {page_data['index']}.")
+
+            # La méthode de visualisation n'a plus besoin des indices
+            fig = self.visualizer.visualize_detected_page(page_data, boxes)
+
+            year_dir = self.output_dir / json_file.parent.name
+            year_dir.mkdir(exist_ok=True)
+            save_path = year_dir / f"{json_file.stem}_page{page_data['index']}_detected.png"
+
+            self._png_writer.save(fig, save_path)
+
+        # Toutes les images du fichier sont écrites au retour
+        self._png_writer.flush()
+
 if __name__ == "__main__":
     processor = DocumentProcessor()
     processor.process_documents()
\ No newline at end of file
@@ -1,17 +1,19 @@
 # nested_detector.py
 
-from typing import Dict, List, Tuple, Any
-from itertools import permutations
+from typing import Dict, List, Tuple, Any, Optional
+import numpy as np
 
 class NestedDetector:
     """Détecte les layouts strictement imbriqués les uns dans les autres."""
 
-    def detect_nested_layouts(self, page_data: Dict[str, Any]) -> List[Tuple[int, int]]:
+    def detect_nested_layouts(self, page_data: Dict[str, Any],
+                              bboxes: Optional[np.ndarray] = None) -> List[Tuple[int, int]]:
         """
         Trouve les paires de layouts (extérieur, intérieur) sur une page.
 
         Args:
             page_data: Les données d'une seule page.
+            bboxes: Tableau (N, 4) des bbox_layout de la page, s'il est déjà calculé.
 
         Returns:
             Une liste de tuples, où chaque tuple contient (index_exterieur, index_interieur).
@@ -20,31 +22,18 @@ class NestedDetector:
         if len(layouts) < 2:
             return []
 
-        nested_pairs = []
-
-        # On teste toutes les paires ordonnées de layouts (l'ordre est important)
-        for outer_candidate, inner_candidate in permutations(layouts, 2):
-            
-            # Récupération des bounding boxes
-            outer_bbox = outer_candidate['bbox_layout']
-            inner_bbox = inner_candidate['bbox_layout']
-            
-            # Décomposition des coordonnées pour lisibilité
-            x1_outer, y1_outer, x2_outer, y2_outer = outer_bbox
-            x1_inner, y1_inner, x2_inner, y2_inner = inner_bbox
-
-            # Vérification de la condition d'inclusion stricte
-            is_strictly_nested = (
-                x1_inner > x1_outer and
-                y1_inner > y1_outer and
-                x2_inner < x2_outer and
-                y2_inner < y2_outer
-            )
-
-            if is_strictly_nested:
-                # Récupération des index originaux
-                outer_index = layouts.index(outer_candidate)
-                inner_index = layouts.index(inner_candidate)
-                nested_pairs.append((outer_index, inner_index))
-                
-        return nested_pairs
\ No newline at end of file
+        if bboxes is None:
+            bboxes = np.asarray([layout['bbox_layout'] for layout in layouts], dtype=np.float64)
+
+        # Toutes les paires ordonnées (extérieur, intérieur) en une seule comparaison :
+        # contains[i, j] est vrai si le layout j est strictement inclus dans le layout i
+        x1, y1, x2, y2 = bboxes.T
+        contains = (
+            (x1[None, :] > x1[:, None]) &
+            (y1[None, :] > y1[:, None]) &
+            (x2[None, :] < x2[:, None]) &
+            (y2[None, :] < y2[:, None])
+        )
+
+        # np.argwhere parcourt la matrice ligne par ligne : même ordre que permutations()
+        return [(outer_index, inner_index) for outer_index, inner_index in np.argwhere(contains).tolist()]
@@ -1,17 +1,31 @@
 # nested_layout_visualizer.py
 
-import json
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.patches import FancyArrow
+from matplotlib.figure import Figure
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 from nested_detector import NestedDetector
+from json_utils import iter_pages, scan_json
+from render_utils import PngWriter, box_outlines, init_worker, page_figure, process_file
 
 class PageVisualizer:
     """Gère la création des visualisations pour les layouts imbriqués."""
+
+    def __init__(self, dpi: int = 100):
+        # Figure Agg hors de pyplot (ce script ne fait qu'enregistrer des PNG), au dpi de sortie,
+        # vidée et redessinée pour chaque page
+        self._fig, self._ax = page_figure((20, 25), dpi)
     
-    def visualize_page(self, page_data: Dict[str, Any], nested_pairs: List[Tuple[int, int]]) -> plt.Figure:
-        fig, ax = plt.subplots(figsize=(20, 25))
+    def visualize_page(self, page_data: Dict[str, Any], nested_pairs: List[Tuple[int, int]],
+                       boxes: Optional[np.ndarray] = None) -> Figure:
+        """boxes : tableau (N, 4) des bbox_layout de la page, s'il est déjà calculé."""
+        fig, ax = self._fig, self._ax
+        ax.cla()
 
         # Couleurs
         COLOR_OUTER = 'red'
@@ -19,60 +33,64 @@ class PageVisualizer:
         COLOR_REGULAR = 'blue'
 
         # Calcul des dimensions pour cadrer la figure
-        all_bboxes = [layout['bbox_layout'] for layout in page_data['page']]
-        x_coords = [bbox[0] for bbox in all_bboxes] + [bbox[2] for bbox in all_bboxes]
-        y_coords = [bbox[1] for bbox in all_bboxes] + [bbox[3] for bbox in all_bboxes]
+        if boxes is None:
+            boxes = np.asarray([layout['bbox_layout'] for layout in page_data['page']], dtype=np.float64)
+        x_coords = boxes[:, [0, 2]]
+        y_coords = boxes[:, [1, 3]]
         padding = 50
-        ax.set_xlim(min(x_coords) - padding, max(x_coords) + padding)
-        ax.set_ylim(max(y_coords) + padding, min(y_coords) - padding)
+        ax.set_xlim(x_coords.min() - padding, x_coords.max() + padding)
+        ax.set_ylim(y_coords.max() + padding, y_coords.min() - padding)
         ax.set_title(f"Page {page_data['index']} - Nested Layout Detection", fontsize=16)
 
-        # Dessiner tous les layouts
-        for idx, layout_data in enumerate(page_data['page']):
-            bbox = layout_data['bbox_layout']
-            width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        # Rôle de chaque layout : la première paire où il apparaît décide
+        pair_colors = {}
+        for outer_idx, inner_idx in nested_pairs:
+            pair_colors.setdefault(outer_idx, COLOR_OUTER)
+            pair_colors.setdefault(inner_idx, COLOR_INNER)
 
+        # Dessiner tous les layouts
+        edge_colors = []
+        line_widths = []
+        for idx, (x_start, y_start) in enumerate(boxes[:, :2].tolist()):
             # Déterminer la couleur et le style
-            edge_color = COLOR_REGULAR
-            line_width = 1.0
-            for outer_idx, inner_idx in nested_pairs:
-                if idx == outer_idx:
-                    edge_color = COLOR_OUTER
-                    line_width = 2.5
-                    break
-                elif idx == inner_idx:
-                    edge_color = COLOR_INNER
-                    line_width = 2.5
-                    break
-            
-            rect = patches.Rectangle((bbox[0], bbox[1]), width, height, linewidth=line_width, edgecolor=edge_color, facecolor='none')
-            ax.add_patch(rect)
-            ax.text(bbox[0], bbox[1] - 5, f"Layout {idx}", fontsize=9, color=edge_color)
-
-        # Dessiner les flèches pour montrer les relations
+            edge_color = pair_colors.get(idx, COLOR_REGULAR)
+            edge_colors.append(edge_color)
+            line_widths.append(1.0 if edge_color == COLOR_REGULAR else 2.5)
+            ax.text(x_start, y_start - 5, f"Layout {idx}", fontsize=9, color=edge_color)
+
+        # Tous les contours en une seule collection.
+        # Les limites sont déjà fixées : pas de mise à jour de dataLim (autolim=False)
+        ax.add_collection(LineCollection(
+            box_outlines(boxes),
+            linewidths=line_widths,
+            colors=edge_colors
+        ), autolim=False)
+
+        # Dessiner les flèches pour montrer les relations, du centre extérieur au centre intérieur
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        arrows = []
         for outer_idx, inner_idx in nested_pairs:
-            outer_bbox = page_data['page'][outer_idx]['bbox_layout']
-            inner_bbox = page_data['page'][inner_idx]['bbox_layout']
-            
-            center_outer_x = (outer_bbox[0] + outer_bbox[2]) / 2
-            center_outer_y = (outer_bbox[1] + outer_bbox[3]) / 2
-            center_inner_x = (inner_bbox[0] + inner_bbox[2]) / 2
-            center_inner_y = (inner_bbox[1] + inner_bbox[3]) / 2
-
-            ax.arrow(center_outer_x, center_outer_y, 
-                     center_inner_x - center_outer_x, 
-                     center_inner_y - center_outer_y,
-                     head_width=15, head_length=15, fc='black', ec='black', length_includes_head=True, alpha=0.6)
+            (start_x, start_y), (end_x, end_y) = centers[outer_idx], centers[inner_idx]
+            arrows.append(FancyArrow(start_x, start_y, end_x - start_x, end_y - start_y,
+                                     head_width=15, head_length=15, length_includes_head=True))
+        if arrows:
+            ax.add_collection(PatchCollection(arrows, facecolors='black', edgecolors='black', alpha=0.6),
+                              autolim=False)
 
         ax.grid(True, linestyle='--')
         return fig
 
 class DocumentProcessor:
-    def __init__(self, base_dir: str = "result_json", output_dir: str = "nested_output"):
+    def __init__(self, base_dir: str = "result_json", output_dir: str = "nested_output",
+                 max_workers: Optional[int] = None, dpi: int = 100, png_compress_level: int = 1):
         self.base_dir = Path(base_dir)
         self.output_dir = Path(output_dir)
+        self.dpi = dpi
+        self.png_compress_level = png_compress_level  # zlib rapide (défaut PNG : 6)
+        self.max_workers = max_workers or os.cpu_count() or 1
         self.detector = NestedDetector()
-        self.visualizer = PageVisualizer()
+        self.visualizer = PageVisualizer(dpi=dpi)
+        self._png_writer = PngWriter(png_compress_level)
 
     def process_documents(self):
         if not self.base_dir.exists():
@@ -82,28 +100,46 @@ class DocumentProcessor:
         self.output_dir.mkdir(exist_ok=True)
         print("Début de la détection des layouts imbriqués...")
 
-        for json_file in sorted(self.base_dir.rglob("*.json")):
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            for page_data in data:
-                nested_pairs = self.detector.detect_nested_layouts(page_data)
-                
-                if nested_pairs:
-                    print(f"  Détection dans {json_file.name}, Page {page_data['index']}: {len(nested_pairs)} paire(s) trouvée(s).")
-                    
-                    fig = self.visualizer.visualize_page(page_data, nested_pairs)
-                    
-                    # S'assurer que le dossier de sortie pour l'année existe
-                    year_output_dir = self.output_dir / json_file.parent.name
-                    year_output_dir.mkdir(exist_ok=True)
-                    
-                    save_path = year_output_dir / f"{json_file.stem}_page{page_data['index']}_nested.png"
-                    fig.savefig(save_path, dpi=150, bbox_inches='tight')
-                    plt.close(fig)
+        json_files = [Path(path) for path in sorted(entry.path for entry in scan_json(self.base_dir))]
+        if self.max_workers > 1 and len(json_files) > 1:
+            # Les fichiers sont indépendants : on les répartit sur plusieurs processus
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(json_files)),
+                                     initializer=init_worker,
+                                     initargs=(partial(DocumentProcessor, str(self.base_dir), str(self.output_dir),
+                                                       max_workers=1, dpi=self.dpi,
+                                                       png_compress_level=self.png_compress_level),)) as pool:
+                list(pool.map(process_file, [str(json_file) for json_file in json_files]))
+        else:
+            for json_file in json_files:
+                self._process_json_file(json_file)
 
         print("Traitement terminé.")
 
+    def _process_json_file(self, json_file: Path):
+        for page_data in iter_pages(json_file):
+            # Boîtes des layouts extraites une seule fois, pour la détection puis le dessin
+            boxes = np.asarray([layout['bbox_layout'] for layout in page_data.get('page', [])], dtype=np.float64)
+            nested_pairs = self.detector.detect_nested_layouts(page_data, boxes)
+
+            if nested_pairs:
+                print(f"  Détection dans {json_file.name}, Page {page_data['index']}: {len(nested_pairs)} paire(s) trouvée(s).")
+
+                fig = self.visualizer.visualize_page(page_data, nested_pairs, boxes)
+
+                # S'assurer que le dossier de sortie pour l'année existe
+                year_output_dir = self.output_dir / json_file.parent.name
+                year_output_dir.mkdir(exist_ok=True)
+
+                save_path = year_output_dir / f"{json_file.stem}_page{page_data['index']}_nested.png"
+                self._png_writer.save(fig, save_path)
+
+        # Toutes les images du fichier sont écrites au retour
+        self._png_writer.flush()
+
+    def process_file_task(self, json_file: str):
+        """Tâche du pool de processus : un fichier JSON."""
+        self._process_json_file(Path(json_file))
+
 if __name__ == "__main__":
     processor = DocumentProcessor()
     processor.process_documents()
\ No newline at end of file
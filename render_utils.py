@@ -0,0 +1,90 @@
+# render_utils.py
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Pages rendues en attente d'encodage PNG (une copie RGBA de la figure chacune)
+MAX_PENDING_WRITES = 2
+
+# Contour fermé d'une boîte [x_start, y_start, x_end, y_end] : 4 coins + retour au premier
+_OUTLINE_INDEX = np.array([[0, 1], [2, 1], [2, 3], [0, 3], [0, 1]])
+
+
+def box_outlines(boxes: np.ndarray) -> np.ndarray:
+    """Convert (N, 4) boxes to the (N, 5, 2) closed polylines expected by LineCollection."""
+    return boxes[:, _OUTLINE_INDEX]
+
+
+def page_figure(figsize: Tuple[int, int], dpi: int) -> Tuple[Figure, Axes]:
+    """Create the Agg figure (outside pyplot) that is cleared and redrawn for every page."""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    # Marges fixes (axes, graduations et titre) : la page est déjà cadrée,
+    # l'enregistrement se passe donc du recadrage bbox_inches='tight' (second rendu)
+    fig.subplots_adjust(left=0.04, right=0.99, bottom=0.025, top=0.975)
+    return fig, ax
+
+
+def save_thumbnail(image: Image.Image, thumb_path: Path, thumbnail_size: Tuple[int, int],
+                   compress_level: int) -> None:
+    """Save a downscaled copy of a visualization (modifies image in place)."""
+    thumb_path.parent.mkdir(exist_ok=True)
+    image.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
+    image.save(thumb_path, compress_level=compress_level)
+
+
+def write_png(pixels: np.ndarray, save_path: Path, compress_level: int,
+              thumb_path: Optional[Path] = None, thumbnail_size: Optional[Tuple[int, int]] = None) -> None:
+    """Encode rendered RGBA pixels as PNG, plus an optional thumbnail."""
+    image = Image.fromarray(pixels)
+    image.save(save_path, optimize=False, compress_level=compress_level)
+    if thumb_path is not None and thumbnail_size is not None:
+        save_thumbnail(image, thumb_path, thumbnail_size, compress_level)
+
+
+class PngWriter:
+    """Writes rendered Agg figures as PNG on a background thread."""
+
+    def __init__(self, compress_level: int):
+        self.compress_level = compress_level
+        # L'encodage PNG (qui libère le GIL) se fait dans un thread pendant le rendu de la page suivante
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: Deque[Future] = deque()
+
+    def save(self, fig: Figure, save_path: Path, thumb_path: Optional[Path] = None,
+             thumbnail_size: Optional[Tuple[int, int]] = None) -> None:
+        """Draw the Agg figure once at its dpi and hand its RGBA buffer to the writer thread."""
+        fig.canvas.draw()
+        # Copie du tampon : la figure est redessinée pour la page suivante pendant l'encodage
+        pixels = np.array(fig.canvas.buffer_rgba())
+        self._pending.append(self._executor.submit(write_png, pixels, save_path, self.compress_level,
+                                                   thumb_path, thumbnail_size))
+        while len(self._pending) > MAX_PENDING_WRITES:
+            self._pending.popleft().result()
+
+    def flush(self) -> None:
+        """Wait for the pending PNG writes (and re-raise their errors)."""
+        while self._pending:
+            self._pending.popleft().result()
+
+
+# Processeur propre à chaque processus du pool
+_worker_processor: Any = None
+
+def init_worker(processor_factory: Callable[[], Any]) -> None:
+    """Pool initializer: build the process's own document processor once."""
+    global _worker_processor
+    _worker_processor = processor_factory()
+
+def process_file(task: Any) -> Any:
+    """Pool task: let the process's document processor handle one file."""
+    return _worker_processor.process_file_task(task)
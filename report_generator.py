@@ -1,29 +1,39 @@
 # report_generator.py
 
-import json
 import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
 
 # Importation de toutes les classes de détection nécessaires
 from column_detector import LayoutAnalyzer  # On utilise l'analyseur de haut niveau pour les colonnes
 from row_detector import RowDetector
 from nested_detector import NestedDetector
+from json_utils import iter_pages, scan_json
+
 
 class ReportGenerator:
     """
     Analyse les documents avec plusieurs détecteurs et génère un rapport CSV consolidé.
     """
-    def __init__(self, base_dir: str = "result_json", output_file: str = "detection_report.csv"):
+    def __init__(self, base_dir: str = "result_json", output_file: str = "detection_report.csv",
+                 max_workers: Optional[int] = None):
         self.base_dir = Path(base_dir)
         self.output_file = Path(output_file)
+        self.max_workers = max_workers or os.cpu_count() or 1
         
         # Initialisation des trois détecteurs
         self.column_analyzer = LayoutAnalyzer()
         self.row_detector = RowDetector()
         self.nested_detector = NestedDetector()
         
-        # Liste pour stocker tous les résultats
-        self.all_detections = []
+        # Les détections sont écrites dans le CSV au fil de l'analyse : seul leur nombre est gardé
+        self.detection_count = 0
+        self._report_file = None
+        self._report_writer = None
 
     def run_full_analysis(self):
         """
@@ -35,62 +45,115 @@ class ReportGenerator:
 
         print("Début de l'analyse complète des documents...")
         
-        # rglob("*.json") parcourt tous les sous-dossiers
-        for json_file in sorted(self.base_dir.rglob("*.json")):
-            print(f"Analyse du fichier : {json_file.name}")
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            for page_data in data:
-                page_number = page_data['index']
-                document_name = json_file.name
-                
-                # --- Test 1: Détection de deux colonnes ---
-                if self.column_analyzer.enhanced_layout_peek(page_data):
-                    self.all_detections.append({
-                        'document_name': document_name,
-                        'page_number': page_number,
-                        'detection_type': 'Deux Colonnes'
-                    })
-
-                # --- Test 2: Détection de ligne horizontale ---
-                if self.row_detector.detect_multi_layout_rows_on_page(page_data):
-                    self.all_detections.append({
-                        'document_name': document_name,
-                        'page_number': page_number,
-                        'detection_type': 'Ligne Horizontale (3+ layouts)'
-                    })
-                
-                # --- Test 3: Détection de layouts imbriqués ---
-                if self.nested_detector.detect_nested_layouts(page_data):
-                    self.all_detections.append({
-                        'document_name': document_name,
-                        'page_number': page_number,
-                        'detection_type': 'Layouts Imbriqués'
-                    })
+        # scan_json parcourt tous les sous-dossiers
+        json_paths = sorted(entry.path for entry in scan_json(self.base_dir))
+        self.detection_count = 0
+        try:
+            if self.max_workers > 1 and len(json_paths) > 1:
+                # Les fichiers sont indépendants : chaque processus renvoie ses lignes de rapport,
+                # écrites dans l'ordre des fichiers
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(json_paths)),
+                                         initializer=_init_worker) as pool:
+                    for detections in pool.map(_analyze_file, json_paths, chunksize=8):
+                        self.write_detections(detections)
+            else:
+                for json_path in json_paths:
+                    self.write_detections(self.analyze_file(Path(json_path)))
+        except BaseException:
+            # Analyse interrompue : le rapport précédent reste en place
+            self._discard_report()
+            raise
 
         print("Analyse terminée.")
         self.save_report()
 
+    def analyze_file(self, json_file: Path) -> List[Tuple[str, Any, str]]:
+        """
+        Exécute les trois détections sur chaque page d'un fichier JSON et renvoie les lignes du rapport
+        (document_name, page_number, detection_type).
+        """
+        print(f"Analyse du fichier : {json_file.name}")
+        detections = []
+        for page_data in iter_pages(json_file):
+            page_number = page_data['index']
+            document_name = json_file.name
+            # Boîtes des layouts extraites une seule fois, partagées par les trois tests
+            layouts = page_data.get('page', [])
+            bboxes = np.asarray([layout['bbox_layout'] for layout in layouts], dtype=np.float64).reshape(-1, 4)
+            
+            # --- Test 1: Détection de deux colonnes ---
+            if self.column_analyzer.enhanced_layout_peek(page_data, bboxes):
+                detections.append((document_name, page_number, 'Deux Colonnes'))
+
+            # --- Test 2: Détection de ligne horizontale ---
+            if self.row_detector.detect_multi_layout_rows_on_page(page_data, bboxes):
+                detections.append((document_name, page_number, 'Ligne Horizontale (3+ layouts)'))
+            
+            # --- Test 3: Détection de layouts imbriqués ---
+            if self.nested_detector.detect_nested_layouts(page_data, bboxes):
+                detections.append((document_name, page_number, 'Layouts Imbriqués'))
+
+        return detections
+
+    def write_detections(self, detections: List[Tuple[str, Any, str]]):
+        """
+        Ajoute des lignes au rapport CSV, ouvert à la première détection.
+        """
+        if not detections:
+            return
+
+        if self._report_writer is None:
+            print(f"Sauvegarde du rapport dans '{self.output_file}'...")
+            # Écriture dans un fichier temporaire, renommé en fin d'analyse par save_report
+            # Tampon de 1 Mio : peu d'appels système même pour un gros rapport
+            self._report_file = open(self._temp_report_path(), 'w', newline='', encoding='utf-8',
+                                     buffering=1 << 20)
+            self._report_writer = csv.writer(self._report_file)
+            # Noms des colonnes pour le fichier CSV
+            self._report_writer.writerow(['document_name', 'page_number', 'detection_type'])
+
+        self._report_writer.writerows(detections)
+        self.detection_count += len(detections)
+
     def save_report(self):
         """
-        Sauvegarde la liste des détections dans un fichier CSV.
+        Ferme le fichier CSV des détections écrites pendant l'analyse et remplace l'ancien rapport.
         """
-        if not self.all_detections:
+        if self._report_writer is None:
             print("Aucune mise en page complexe détectée. Le rapport est vide.")
             return
 
-        print(f"Sauvegarde du rapport dans '{self.output_file}'...")
-        
-        # Noms des colonnes pour le fichier CSV
-        fieldnames = ['document_name', 'page_number', 'detection_type']
-        
-        with open(self.output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()  # Écrit la ligne d'en-tête
-            writer.writerows(self.all_detections) # Écrit toutes les données
+        self._report_file.close()
+        self._report_file = None
+        self._report_writer = None
+        os.replace(self._temp_report_path(), self.output_file)
+
+        print(f"Rapport généré avec succès avec {self.detection_count} détections.")
+
+    def _discard_report(self):
+        """
+        Ferme et supprime le CSV temporaire d'une analyse qui n'est pas allée au bout.
+        """
+        if self._report_file is None:
+            return
+        self._report_file.close()
+        self._report_file = None
+        self._report_writer = None
+        Path(self._temp_report_path()).unlink(missing_ok=True)
+
+    def _temp_report_path(self) -> str:
+        return f"{self.output_file}.tmp"
+
+
+# Générateur (et détecteurs) propre à chaque processus du pool
+_worker_generator: Optional[ReportGenerator] = None
+
+def _init_worker():
+    global _worker_generator
+    _worker_generator = ReportGenerator(max_workers=1)
 
-        print(f"Rapport généré avec succès avec {len(self.all_detections)} détections.")
+def _analyze_file(json_path: str) -> List[Tuple[str, Any, str]]:
+    return _worker_generator.analyze_file(Path(json_path))
 
 
 if __name__ == "__main__":
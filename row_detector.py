@@ -1,6 +1,8 @@
 # row_detector.py
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+import numpy as np
 
 class RowDetector:
     """Détecte les pages contenant des alignements horizontaux de plusieurs layouts."""
@@ -13,28 +15,36 @@ class RowDetector:
         self.scan_step = scan_step
         self.threshold_percentage = threshold_percentage
 
-    def detect_multi_layout_rows_on_page(self, page_data: Dict[str, Any]) -> bool:
+    def detect_multi_layout_rows_on_page(self, page_data: Dict[str, Any],
+                                         bboxes: Optional[np.ndarray] = None) -> bool:
         """
         Détecte si une page contient suffisamment de lignes avec 3+ layouts.
+        bboxes : tableau (N, 4) des bbox_layout de la page, s'il est déjà calculé.
         """
         layouts_on_page = page_data.get('page', [])
-        if not layouts_on_page:
+        # Aucune ligne ne peut couper min_layouts_in_row layouts s'il y en a moins sur la page
+        if not layouts_on_page or len(layouts_on_page) < self.min_layouts_in_row:
             return False
 
         # Déterminer la hauteur totale de la zone
-        all_y_coords = [coord for layout in layouts_on_page for coord in (layout['bbox_layout'][1], layout['bbox_layout'][3])]
-        min_y, max_y = min(all_y_coords), max(all_y_coords)
+        if bboxes is None:
+            bboxes = np.asarray([layout['bbox_layout'] for layout in layouts_on_page], dtype=np.float64)
+        y1, y2 = bboxes[:, 1], bboxes[:, 3]
+        min_y, max_y = min(y1.min(), y2.min()), max(y1.max(), y2.max())
 
         if max_y <= min_y:
             return False
 
-        scanline_results = []
-        for y in range(int(min_y), int(max_y), self.scan_step):
-            intersected_count = sum(1 for layout in layouts_on_page if layout['bbox_layout'][1] <= y <= layout['bbox_layout'][3])
-            scanline_results.append(intersected_count >= self.min_layouts_in_row)
-
-        if not scanline_results:
+        scanlines = np.arange(int(min_y), int(max_y), self.scan_step)
+        if len(scanlines) == 0:
             return False
-            
-        percentage_of_true = (scanline_results.count(True) / len(scanline_results)) * 100
+
+        # Nombre de layouts coupés par chaque ligne y (y1 <= y <= y2) : #(y1 <= y) - #(y2 < y),
+        # par recherche dichotomique sur les bornes triées. Une boîte inversée (y1 > y2) ne coupe aucune ligne.
+        valid = y1 <= y2
+        intersected_counts = (np.searchsorted(np.sort(y1[valid]), scanlines, side='right') -
+                              np.searchsorted(np.sort(y2[valid]), scanlines, side='left'))
+        scanline_results = intersected_counts >= self.min_layouts_in_row
+
+        percentage_of_true = scanline_results.mean() * 100
         return percentage_of_true > self.threshold_percentage
\ No newline at end of file
@@ -0,0 +1,90 @@
+import json
+import random
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+from scipy.stats import gaussian_kde
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from column_detector import (ColumnDetector, KDE_DIRECT_CHUNK, KDE_GRID_POINTS, MIDDLE_DIP_THRESHOLD,
+                             MIDDLE_END_IDX, MIDDLE_START_IDX, MIN_BOX_WIDTH_RATIO, MIN_SPREAD_RATIO,
+                             SIDE_PEAK_THRESHOLD)
+
+
+def gaussian_kde_reference(layout, detector):
+    """Two-column decision computed with scipy's gaussian_kde, as the detector originally did."""
+    bbox_text = layout.get('bbox_text')
+    layout_width = layout['bbox_layout'][2] - layout['bbox_layout'][0]
+    if not bbox_text or len(bbox_text) < detector.min_text_boxes_init or layout_width == 0:
+        return False
+    x_midpoints = [(x_start + x_end) / 2 for x_start, _, x_end, _ in bbox_text
+                   if (x_end - x_start) / layout_width >= MIN_BOX_WIDTH_RATIO]
+    if len(x_midpoints) < max(detector.min_text_boxes_init, 8):
+        return False
+    if (max(x_midpoints) - min(x_midpoints)) / layout_width < MIN_SPREAD_RATIO:
+        return False
+    try:
+        x_range = np.linspace(min(x_midpoints), max(x_midpoints), KDE_GRID_POINTS)
+        density = gaussian_kde(x_midpoints, bw_method='silverman')(x_range)
+    except Exception:
+        return False
+    density = density / density.max()
+    return bool(density[MIDDLE_START_IDX:MIDDLE_END_IDX].min() < MIDDLE_DIP_THRESHOLD
+                and density[:MIDDLE_START_IDX].max() > SIDE_PEAK_THRESHOLD
+                and density[MIDDLE_END_IDX:].max() > SIDE_PEAK_THRESHOLD)
+
+
+def random_layout(rng, n_boxes):
+    width = rng.uniform(400, 1200)
+    # Moitié des layouts en deux colonnes (milieux autour de 25 % et 75 %), les autres au hasard
+    spread = rng.uniform(0.03, 0.12) if rng.random() < 0.5 else None
+    bbox_text = []
+    for _ in range(n_boxes):
+        if spread is None:
+            center = rng.uniform(0, width)
+        else:
+            center = rng.gauss(width * rng.choice((0.25, 0.75)), width * spread)
+        half = rng.uniform(width * 0.05, width * 0.2)
+        y = rng.uniform(0, 1000)
+        bbox_text.append([center - half, y, center + half, y + 20])
+    return {'bbox_layout': [0, 0, width, 1000], 'bbox_text': bbox_text}
+
+
+class GaussianDensityTest(unittest.TestCase):
+    def test_matches_gaussian_kde_on_result_json(self):
+        json_files = sorted((ROOT_DIR / 'result_json').rglob('*.json'))
+        if not json_files:
+            self.skipTest('result_json is not available')
+        detector = ColumnDetector()
+        mismatches = []
+        for json_file in json_files:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                pages = json.load(f)
+            for page in pages:
+                for position, layout in enumerate(page.get('page', [])):
+                    if detector.detect_two_column_layout(layout) != gaussian_kde_reference(layout, detector):
+                        mismatches.append((json_file.name, page.get('index'), position))
+        self.assertEqual(mismatches, [])
+
+    def test_matches_gaussian_kde_on_random_layouts(self):
+        rng = random.Random(0)
+        detector = ColumnDetector()
+        for _ in range(500):
+            layout = random_layout(rng, rng.randint(0, 80))
+            self.assertEqual(detector.detect_two_column_layout(layout), gaussian_kde_reference(layout, detector))
+
+    def test_chunked_sum_matches_gaussian_kde(self):
+        rng = np.random.default_rng(0)
+        x_midpoints = np.concatenate([rng.normal(200, 40, KDE_DIRECT_CHUNK), rng.normal(700, 40, KDE_DIRECT_CHUNK + 7)])
+        x_min, x_max = x_midpoints.min(), x_midpoints.max()
+        density = ColumnDetector()._gaussian_density(x_midpoints, x_min, x_max)
+        expected = gaussian_kde(x_midpoints, bw_method='silverman')(np.linspace(x_min, x_max, KDE_GRID_POINTS))
+        np.testing.assert_allclose(density / density.max(), expected / expected.max(), rtol=1e-9, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
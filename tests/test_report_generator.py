@@ -0,0 +1,55 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from column_detector import LayoutAnalyzer
+from report_generator import ReportGenerator
+
+
+class EmptyPageTest(unittest.TestCase):
+    def test_enhanced_layout_peek_accepts_empty_bbox_array(self):
+        page = {'index': 1, 'page': []}
+        self.assertEqual(LayoutAnalyzer().enhanced_layout_peek(page, np.asarray([], dtype=np.float64)), [])
+        self.assertEqual(LayoutAnalyzer().enhanced_layout_peek(page), [])
+
+    def test_analyze_file_skips_empty_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = Path(tmp) / 'doc.json'
+            json_file.write_text(json.dumps([{'index': 1, 'page': []}]), encoding='utf-8')
+            generator = ReportGenerator(base_dir=tmp, output_file=str(Path(tmp) / 'report.csv'), max_workers=1)
+            self.assertEqual(generator.analyze_file(json_file), [])
+
+
+class InterruptedRunTest(unittest.TestCase):
+    def test_failed_run_keeps_previous_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ('a.json', 'b.json'):
+                (Path(tmp) / name).write_text(json.dumps([{'index': 1, 'page': []}]), encoding='utf-8')
+            report = Path(tmp) / 'report.csv'
+            report.write_text('previous report\n', encoding='utf-8')
+
+            generator = ReportGenerator(base_dir=tmp, output_file=str(report), max_workers=1)
+            calls = []
+
+            def analyze_file(json_file):
+                calls.append(json_file)
+                if len(calls) == 2:
+                    raise RuntimeError('boom')
+                return [(json_file.name, 1, 'Deux Colonnes')]
+
+            generator.analyze_file = analyze_file
+            with self.assertRaises(RuntimeError):
+                generator.run_full_analysis()
+
+            self.assertEqual(report.read_text(encoding='utf-8'), 'previous report\n')
+            self.assertEqual(sorted(p.name for p in Path(tmp).iterdir()), ['a.json', 'b.json', 'report.csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
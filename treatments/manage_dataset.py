@@ -1,8 +1,35 @@
 # manage_dataset.py (Corrigé)
 
 import json
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+
+# Les scripts de treatments/ sont lancés depuis ce dossier : json_utils est à la racine du dépôt
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from json_utils import scan_json  # réexporté pour passe4_processTables_final
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module standard
+    orjson = None
+
+def read_json(path: Path) -> Any:
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_json(document: Any, path: Path):
+    # Même mise en forme que json.dump(indent=2, ensure_ascii=False) : UTF-8 brut, indentation de 2
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(document, option=orjson.OPT_INDENT_2))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
 
 class LayoutManager:
     def execute(self, layout_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -29,9 +56,10 @@ class DocumentManager:
         return [self.page_manager.execute(page, file_path) for page in document_data]
 
 class DataSetManager:
-    def __init__(self, source_dir: str, output_dir: str):
+    def __init__(self, source_dir: str, output_dir: str, max_workers: Optional[int] = None):
         self.source_path = Path(source_dir)
         self.output_path = Path(output_dir)
+        self.max_workers = max_workers or os.cpu_count() or 1
         
         self.layout_manager = LayoutManager()
         self.page_manager = PageManager(self.layout_manager)
@@ -47,22 +75,56 @@ class DataSetManager:
         self.output_path.mkdir(exist_ok=True)
         print(f"Traitement en cours... Sortie dans '{self.output_path}'")
 
-        for year_dir in sorted(self.source_path.iterdir()):
-            if not year_dir.is_dir():
-                continue
-            
+        # os.scandir renvoie le type d'entrée sans stat supplémentaire
+        with os.scandir(self.source_path) as entries:
+            year_paths = sorted(entry.path for entry in entries if entry.is_dir())
+
+        tasks = []
+        for year_dir in map(Path, year_paths):
             output_year_dir = self.output_path / year_dir.name
             output_year_dir.mkdir(exist_ok=True)
             
             print(f"  Traitement de l'année : {year_dir.name}")
-            for json_file in sorted(year_dir.glob("*.json")):
-                with open(json_file, "r", encoding="utf-8") as f:
-                    original_document = json.load(f)
-                
-                processed_document = self.document_manager.execute(original_document, json_file)
-                
-                output_file_path = output_year_dir / json_file.name
-                with open(output_file_path, "w", encoding="utf-8") as f:
-                    json.dump(processed_document, f, indent=2, ensure_ascii=False)
+            with os.scandir(year_dir) as entries:
+                json_paths = sorted(entry.path for entry in entries
+                                    if entry.name.endswith(".json") and entry.is_file())
+            tasks.extend((json_path, str(output_year_dir)) for json_path in json_paths)
+
+        manager_payload = None
+        if self.max_workers > 1 and len(tasks) > 1:
+            # Le DocumentManager injecté doit pouvoir être copié dans les processus du pool
+            try:
+                manager_payload = pickle.dumps(self.document_manager)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                print(f"  DocumentManager non sérialisable ({e}) : traitement séquentiel.")
+
+        if manager_payload is not None:
+            # Les documents sont indépendants : le DocumentManager (éventuellement injecté)
+            # est reconstruit une fois dans chaque processus du pool
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks)),
+                                     initializer=_init_worker,
+                                     initargs=(manager_payload,)) as pool:
+                list(pool.map(_process_task, tasks, chunksize=8))
+        else:
+            for json_path, output_year_dir in tasks:
+                _process_document(self.document_manager, Path(json_path), Path(output_year_dir))
         
-        print("Traitement du dataset terminé.")
\ No newline at end of file
+        print("Traitement du dataset terminé.")
+
+
+def _process_document(document_manager: DocumentManager, json_file: Path, output_year_dir: Path):
+    original_document = read_json(json_file)
+    processed_document = document_manager.execute(original_document, json_file)
+    write_json(processed_document, output_year_dir / json_file.name)
+
+
+# DocumentManager propre à chaque processus du pool
+_worker_document_manager: Optional[DocumentManager] = None
+
+def _init_worker(manager_payload: bytes):
+    global _worker_document_manager
+    _worker_document_manager = pickle.loads(manager_payload)
+
+def _process_task(task: Tuple[str, str]):
+    json_path, output_year_dir = task
+    _process_document(_worker_document_manager, Path(json_path), Path(output_year_dir))
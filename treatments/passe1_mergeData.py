@@ -1,9 +1,8 @@
 
-import json
 from pathlib import Path
 from typing import List, Dict, Any
 
-from manage_dataset import DataSetManager, DocumentManager, PageManager
+from manage_dataset import DataSetManager, DocumentManager, PageManager, read_json
 
 ROOT_DIR = Path(__file__).resolve().parents[1] # Cette ligne reste utile pour trouver le dossier 'states'
 
@@ -22,33 +21,22 @@ class MergingDocumentManager(DocumentManager):
         relative_path = file_path_v1.relative_to(self.source_path)
         file_path_v2 = self.v2_path / relative_path
 
-        # Si pas de version V2, on retourne simplement la V1
-        if not file_path_v2.exists():
+        # Charger les pages recalculées de la V2 (une seule ouverture, sans exists() préalable)
+        try:
+            document_data_v2 = read_json(file_path_v2)
+        except FileNotFoundError:
+            # Si pas de version V2, on retourne simplement la V1
             return document_data_v1
 
         # --- LOGIQUE DE FUSION PAR PAGE ---
         print(f"    -> Fusion par page pour {file_path_v1.name}...")
         
-        # Charger les pages recalculées de la V2
-        with open(file_path_v2, "r", encoding="utf-8") as f:
-            document_data_v2 = json.load(f)
-        
         # Créer un dictionnaire des pages V2 pour un accès rapide (clé = index de la page)
         v2_pages_map = {page['index']: page for page in document_data_v2}
         
-        merged_document = []
-        # Parcourir les pages du document original V1
-        for page_v1 in document_data_v1:
-            page_index = page_v1.get('index')
-            
-            # Si une version de cette page existe dans notre map V2, on l'utilise
-            if page_index in v2_pages_map:
-                merged_document.append(v2_pages_map[page_index])
-            else:
-                # Sinon, on garde la page originale V1
-                merged_document.append(page_v1)
-                
-        return merged_document
+        # Pour chaque page V1 : sa version V2 si elle existe, sinon la page originale V1
+        # (.get('index') : une page V1 sans index est conservée telle quelle)
+        return [v2_pages_map.get(page_v1.get('index'), page_v1) for page_v1 in document_data_v1]
 
 
 if __name__ == "__main__":
@@ -9,14 +9,22 @@ from typing import Dict, List, Any
 from manage_dataset import DataSetManager, LayoutManager
 ROOT_DIR = Path(__file__).resolve().parents[1] # Cette ligne reste utile pour trouver le dossier 'states'
 
+try:
+    import re2 as _re_engine  # google-re2 : moteur en temps linéaire, sans retour arrière
+except ImportError:  # re2 est optionnel : repli sur le module standard
+    _re_engine = re
+
+# Expression régulière pour trouver et supprimer les balises HTML (ex: <b>, </i>, <...>), compilée une fois.
+# Une balise non fermée en fin de texte est aussi retirée ; le '/' est couvert par [^>]+
+_HTML_TAG_RE = _re_engine.compile(r'<[^>]+(?:>|$)')
+
 
 class TagRemovingLayoutManager(LayoutManager):
     """
     Un LayoutManager personnalisé qui nettoie les balises HTML du texte d'un layout.
     """
     def __init__(self):
-        # Expression régulière pour trouver et supprimer les balises HTML (ex: <b>, </i>, <...>)
-        self.html_tag_regex = re.compile('</?[^>]+(>|$)')
+        # Le motif reste au niveau du module : un motif re2 ne se sérialise pas vers les processus du pool
         print("TagRemovingLayoutManager initialisé.")
 
     def execute(self, layout_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -29,14 +37,14 @@ class TagRemovingLayoutManager(LayoutManager):
         if not original_text_list:
             return processed_layout # Retourner le layout tel quel s'il n'y a pas de texte
 
-        cleaned_text_list = []
-        for text_entry in original_text_list:
-            # Appliquer le regex pour substituer les balises par une chaîne vide
-            cleaned_text = self.html_tag_regex.sub('', text_entry)
-            cleaned_text_list.append(cleaned_text)
-        
+        # Appliquer le regex pour substituer les balises par une chaîne vide,
+        # uniquement sur les textes contenant un '<' (la plupart n'en ont aucun)
+        sub = _HTML_TAG_RE.sub
         # Remplacer la liste de textes originale par la nouvelle liste nettoyée
-        processed_layout['text'] = cleaned_text_list
+        processed_layout['text'] = [
+            text_entry if '<' not in text_entry else sub('', text_entry)
+            for text_entry in original_text_list
+        ]
         
         return processed_layout
 
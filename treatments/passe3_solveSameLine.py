@@ -2,7 +2,8 @@
 
 import json
 from pathlib import Path
-from collections import defaultdict
+
+import numpy as np
 
 # L'import fonctionne directement car manage_dataset.py est dans le même dossier
 from manage_dataset import DataSetManager, PageManager, LayoutManager
@@ -24,24 +25,16 @@ class SameLineReorderingPageManager(PageManager):
             return page_data
 
         # 1. Regrouper les layouts par "rangée" en utilisant la formule de magnétisme
-        row_groups = defaultdict(list)
-        for layout in original_layouts:
-            # On utilise la coordonnée y_start pour déterminer la ligne
-            y_start = layout['bbox_layout'][1]
-            snapped_y = int(y_start / self.snap_grid_size) * self.snap_grid_size
-            row_groups[snapped_y].append(layout)
+        # On utilise la coordonnée y_start pour déterminer la ligne (troncature vers zéro comme int())
+        # Un seul parcours des layouts pour (x_start, y_start)
+        starts = np.array([layout['bbox_layout'][:2] for layout in original_layouts], dtype=np.float64)
+        x_starts, y_starts = starts[:, 0], starts[:, 1]
+        snapped_y = np.trunc(y_starts / self.snap_grid_size)
 
-        # 2. Reconstruire la liste des layouts, triée par rangée puis par position X
-        new_layout_list = []
-        # On trie les clés (les y "snappés") pour traiter les rangées de haut en bas
-        for snapped_y in sorted(row_groups.keys()):
-            layouts_in_row = row_groups[snapped_y]
-            
-            # On trie les layouts dans la rangée par leur coordonnée x_start (de gauche à droite)
-            sorted_row = sorted(layouts_in_row, key=lambda l: l['bbox_layout'][0])
-            
-            # On ajoute la rangée triée à notre liste finale
-            new_layout_list.extend(sorted_row)
+        # 2. Reconstruire la liste des layouts, triée par rangée (de haut en bas) puis par x_start
+        # (de gauche à droite). lexsort est stable : à égalité, l'ordre d'origine est conservé.
+        order = np.lexsort((x_starts, snapped_y))
+        new_layout_list = [original_layouts[i] for i in order]
 
         # 3. Mettre à jour la page avec la nouvelle liste de layouts ordonnée
         processed_page = page_data.copy()
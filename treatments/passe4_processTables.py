@@ -1,10 +1,14 @@
-import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any
 from dataclasses import dataclass, field
 
+import numpy as np
+
+from manage_dataset import read_json, write_json
+from table_geometry import best_cells, centers_contained, grid_cells, split_table_data
+
 # --- Étape 0 : Structure de Données ---
-@dataclass
+@dataclass(slots=True)
 class TableCell:
     """Structure de données pour une cellule de tableau."""
     box: List[float]
@@ -16,40 +20,23 @@ class TableCell:
     @property
     def y1(self): return self.box[1]
 
-# --- Fonctions Utilitaires ---
-def get_intersection(box1: List[float], box2: List[float]) -> Optional[List[float]]:
-    """Calcule la boîte d'intersection entre deux boîtes."""
-    x1, y1, x2, y2 = max(box1[0], box2[0]), max(box1[1], box2[1]), min(box1[2], box2[2]), min(box1[3], box2[3])
-    if x1 < x2 and y1 < y2:
-        return [x1, y1, x2, y2]
-    return None
-
-def get_area(box: List[float]) -> float:
-    """Calcule l'aire d'une boîte."""
-    return (box[2] - box[0]) * (box[3] - box[1])
-
-def is_contained(inner_box: List[float], outer_box: List[float]) -> bool:
-    """Vérifie si le centre d'une boîte est contenu dans une autre."""
-    center_x, center_y = (inner_box[0] + inner_box[2]) / 2, (inner_box[1] + inner_box[3]) / 2
-    return (outer_box[0] <= center_x <= outer_box[2] and outer_box[1] <= center_y <= outer_box[3])
-
 class TableProcessor:
     """Contient la logique de traitement des tableaux."""
 
     def process_table_layout(self, text_layout: Dict[str, Any], table_structure: Dict[str, Any]) -> Dict[str, Any]:
         
         # ÉTAPE 1: Générer toutes les cellules possibles du tableau
-        rows = [d['bbox'] for d in table_structure['table_data'] if d['label'] in ('table row', 'table row header')]
-        cols = [d['bbox'] for d in table_structure['table_data'] if d['label'] in ('table column', 'table column header')]
+        rows, cols, spanning_cells_data = split_table_data(table_structure['table_data'])
         
-        cellulesArray = [TableCell(box=cell_box) for r_box in rows for c_box in cols if (cell_box := get_intersection(r_box, c_box)) and get_area(cell_box) > 0]
+        unit_boxes = grid_cells(rows, cols)
         
         # ÉTAPE 2: Minimization des cellules (gestion des 'merged cells')
-        spanning_cells_data = [d['bbox'] for d in table_structure['table_data'] if d['label'] == 'table spanning cell']
-        
+        # Centres des cellules unitaires testés contre toutes les cellules fusionnées en une seule matrice
+        # Les TableCell ne sont créées que pour les cellules unitaires conservées
+        covered = centers_contained(unit_boxes, spanning_cells_data)
         unit_cells_to_keep = [
-            unit_cell for unit_cell in cellulesArray 
-            if not any(is_contained(unit_cell.box, sp_box) for sp_box in spanning_cells_data)
+            TableCell(box=unit_box) for unit_box, is_covered in zip(unit_boxes, covered)
+            if not is_covered
         ]
         
         spanning_cells = [TableCell(box=sp_box) for sp_box in spanning_cells_data]
@@ -59,30 +46,39 @@ class TableProcessor:
             print("Avertissement : Aucune cellule n'a pu être générée.")
             return text_layout
 
-        # ÉTAPE 3: Affectation du texte
-        all_text_boxes = zip(text_layout.get('bbox_text', []), text_layout.get('text', []))
-        for text_bbox, text_content in all_text_boxes:
-            best_cell = max(cellulesArray, key=lambda cell: get_area(get_intersection(text_bbox, cell.box) or [0,0,0,0]))
-            
-            if get_area(get_intersection(text_bbox, best_cell.box) or [0,0,0,0]) > 0:
-                best_cell.texts_bboxes.append(text_bbox)
-                best_cell.texts.append(text_content)
+        # Géométrie des cellules en un seul tableau contigu (C, 4), partagé par les étapes 3 et 5
+        cell_boxes = np.asarray([cell.box for cell in cellulesArray], dtype=np.float64)
+
+        # ÉTAPE 3: Affectation du texte (toutes les aires texte x cellule en une seule matrice)
+        all_text_boxes = list(zip(text_layout.get('bbox_text', []), text_layout.get('text', [])))
+        text_boxes = np.asarray([text_bbox for text_bbox, _ in all_text_boxes], dtype=np.float64).reshape(-1, 4)
+        best_indices = best_cells(text_boxes, cell_boxes)
                 
-        # ÉTAPE 4: Ordonner le texte à l'intérieur de chaque cellule
-        for cell in cellulesArray:
-            if len(cell.texts) > 1:
-                sorted_items = sorted(zip(cell.texts_bboxes, cell.texts), key=lambda item: (item[0][1], item[0][0]))
-                cell.texts_bboxes, cell.texts = list(zip(*sorted_items)) if sorted_items else ([], [])
+        # ÉTAPE 4: Ordonner le texte à l'intérieur de chaque cellule, par un seul tri stable
+        # (cellule, y1, x1) de tous les textes affectés, puis ajout dans cet ordre
+        assigned = np.flatnonzero(best_indices >= 0)
+        order = assigned[np.lexsort((text_boxes[assigned, 0], text_boxes[assigned, 1], best_indices[assigned]))]
+        # Indices en entiers Python : pas de scalaires NumPy dans la boucle
+        cell_of_text = best_indices.tolist()
+        for i in order.tolist():
+            text_bbox, text_content = all_text_boxes[i]
+            best_cell = cellulesArray[cell_of_text[i]]
+            best_cell.texts_bboxes.append(text_bbox)
+            best_cell.texts.append(text_content)
 
         # ÉTAPE 5: Extraction des lignes structurées
         structured_rows = []
-        for r_box in sorted(rows, key=lambda b: b[1]):
-            row_center_y = (r_box[1] + r_box[3]) / 2
-            
-            cells_in_row = [cell for cell in cellulesArray if abs(((cell.box[1] + cell.box[3]) / 2) - row_center_y) < 10]
-            sorted_cells = sorted(cells_in_row, key=lambda c: c.x1)
-            
-            row_texts = [" ".join(cell.texts) for cell in sorted_cells]
+        rows_array = np.asarray(sorted(rows, key=lambda b: b[1]), dtype=np.float64).reshape(-1, 4)
+        row_centers_y = (rows_array[:, 1] + rows_array[:, 3]) / 2
+        # Cellules triées une seule fois par x1 (tri stable, comme sorted() sur les cellules)
+        by_x = np.argsort(cell_boxes[:, 0], kind='stable')
+        cell_centers_y = (cell_boxes[by_x, 1] + cell_boxes[by_x, 3]) / 2
+        # Matrice d'appartenance ligne x cellule (R, C), colonnes déjà de gauche à droite
+        in_row = np.abs(cell_centers_y[None, :] - row_centers_y[:, None]) < 10
+        # Texte de chaque cellule joint une seule fois, même si elle appartient à plusieurs lignes
+        cell_texts = [" ".join(cell.texts) for cell in cellulesArray]
+        for row_mask in in_row:
+            row_texts = [cell_texts[i] for i in by_x[row_mask].tolist()]
             structured_rows.append(row_texts)
             
         # ÉTAPE 6: Sauvegarde dans une nouvelle clé
@@ -103,10 +99,8 @@ if __name__ == "__main__":
 
     print(f"Lancement du débogage pour la page {PAGE_INDEX_TO_DEBUG} de {original_doc_path.name}")
 
-    with open(original_doc_path, "r", encoding="utf-8") as f:
-        original_doc = json.load(f)
-    with open(table_doc_path, "r", encoding="utf-8") as f:
-        tables_doc = json.load(f)
+    original_doc = read_json(original_doc_path)
+    tables_doc = read_json(table_doc_path)
         
     original_page = next((p for p in original_doc if p['index'] == PAGE_INDEX_TO_DEBUG), None)
     table_page_info = next((t for t in tables_doc if t['index'] == PAGE_INDEX_TO_DEBUG), None)
@@ -128,7 +122,6 @@ if __name__ == "__main__":
             output_path = Path(__file__).parent / f"debug_{original_doc_path.stem}_page_{PAGE_INDEX_TO_DEBUG}.json"
             
             print("\n--- Sauvegarde du résultat ---")
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(result_layout, f, indent=2, ensure_ascii=False)
+            write_json(result_layout, output_path)
             
             print(f"Le layout traité a été sauvegardé dans : {output_path}")
\ No newline at end of file
@@ -1,11 +1,14 @@
-import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any
 from dataclasses import dataclass, field
-from collections import defaultdict
+
+import numpy as np
+
+from manage_dataset import read_json, write_json
+from table_geometry import best_cells, centers_contained, grid_cells, split_table_data
 
 # --- Étape 0 : Structure de Données ---
-@dataclass
+@dataclass(slots=True)
 class TableCell:
     box: List[float]
     texts: List[str] = field(default_factory=list)
@@ -19,73 +22,70 @@ class TableCell:
     def center_y(self): return (self.box[1] + self.box[3]) / 2
 
 # --- Fonctions Utilitaires ---
-def get_intersection(box1: List[float], box2: List[float]) -> Optional[List[float]]:
-    x1, y1, x2, y2 = max(box1[0], box2[0]), max(box1[1], box2[1]), min(box1[2], box2[2]), min(box1[3], box2[3])
-    if x1 < x2 and y1 < y2:
-        return [x1, y1, x2, y2]
-    return None
-
-def get_area(box: List[float]) -> float:
-    return (box[2] - box[0]) * (box[3] - box[1])
+SUPER_CELL_LABELS = frozenset(('table spanning cell', 'table column header', 'table row header'))
 
 def get_center(box: List[float]) -> tuple[float, float]:
     return ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
 
-def is_contained(point: tuple[float, float], outer_box: List[float]) -> bool:
-    return (outer_box[0] <= point[0] <= outer_box[2] and outer_box[1] <= point[1] <= outer_box[3])
-
 class TableProcessor:
     def process_table_layout(self, text_layout: Dict[str, Any], table_structure: Dict[str, Any]) -> Dict[str, Any]:
         
         # Étapes 1 à 4: Construction des cellules et affectation du texte (inchangées et correctes)
-        rows_bboxes_model = [d['bbox'] for d in table_structure['table_data'] if d['label'] in ('table row', 'table row header')]
-        cols_bboxes_model = [d['bbox'] for d in table_structure['table_data'] if d['label'] in ('table column', 'table column header')]
+        rows_bboxes_model, cols_bboxes_model, super_cells_data = split_table_data(table_structure['table_data'], SUPER_CELL_LABELS)
         
-        unit_cells_grid = [TableCell(box=cell_box) for r_box in rows_bboxes_model for c_box in cols_bboxes_model if (cell_box := get_intersection(r_box, c_box)) and get_area(cell_box) > 0]
+        unit_boxes_grid = grid_cells(rows_bboxes_model, cols_bboxes_model)
         
-        super_cells_data = [d['bbox'] for d in table_structure['table_data'] if d['label'] in ('table spanning cell', 'table column header', 'table row header')]
-        unit_cells_to_keep = [uc for uc in unit_cells_grid if not any(is_contained(get_center(uc.box), sp_box) for sp_box in super_cells_data)]
+        covered = centers_contained(unit_boxes_grid, super_cells_data)
+        unit_cells_to_keep = [TableCell(box=ub) for ub, is_covered in zip(unit_boxes_grid, covered) if not is_covered]
         super_cells = [TableCell(box=sp_box) for sp_box in super_cells_data]
         cellulesArray = unit_cells_to_keep + super_cells
         
         if not cellulesArray: return text_layout
 
-        for text_bbox, text_content in zip(text_layout.get('bbox_text', []), text_layout.get('text', [])):
-            best_cell = max(cellulesArray, key=lambda cell: get_area(get_intersection(text_bbox, cell.box) or [0,0,0,0]))
-            if get_area(get_intersection(text_bbox, best_cell.box) or [0,0,0,0]) > 0:
-                best_cell.texts_bboxes.append(text_bbox)
-                best_cell.texts.append(text_content)
-                
-        for cell in cellulesArray:
-            if len(cell.texts) > 1:
-                sorted_items = sorted(zip(cell.texts_bboxes, cell.texts), key=lambda item: (item[0][1], item[0][0]))
-                cell.texts_bboxes, cell.texts = list(zip(*sorted_items)) if sorted_items else ([], [])
+        cell_boxes = np.asarray([cell.box for cell in cellulesArray], dtype=np.float64)
+
+        all_text_boxes = list(zip(text_layout.get('bbox_text', []), text_layout.get('text', [])))
+        text_boxes = np.asarray([text_bbox for text_bbox, _ in all_text_boxes], dtype=np.float64).reshape(-1, 4)
+        best_indices = best_cells(text_boxes, cell_boxes)
+
+        # Un seul tri stable (cellule, y1, x1) de tous les textes affectés
+        assigned = np.flatnonzero(best_indices >= 0)
+        order = assigned[np.lexsort((text_boxes[assigned, 0], text_boxes[assigned, 1], best_indices[assigned]))]
+        cell_of_text = best_indices.tolist()
+        for i in order.tolist():
+            text_bbox, text_content = all_text_boxes[i]
+            best_cell = cellulesArray[cell_of_text[i]]
+            best_cell.texts_bboxes.append(text_bbox)
+            best_cell.texts.append(text_content)
 
         # --- ÉTAPE 5 (FINALE) : Combinaison de la déduction de ligne ET de la duplication ---
         structured_rows = []
         reference_cols = sorted(cols_bboxes_model, key=lambda c: c[0])
         
-        # 1. Déduire les lignes en groupant les cellules par hauteur
-        row_groups = defaultdict(list)
+        # 1. Déduire les lignes en groupant les cellules par hauteur : tri stable des indices
+        # sur le y "snappé" (troncature comme int()), puis découpe aux changements de valeur
         snap_grid_size = 15 # Tolérance verticale
-        for cell in cellulesArray:
-            snapped_y = int(cell.center_y / snap_grid_size) * snap_grid_size
-            row_groups[snapped_y].append(cell)
+        snapped_y = np.trunc((cell_boxes[:, 1] + cell_boxes[:, 3]) / 2 / snap_grid_size)
+        by_row = np.argsort(snapped_y, kind='stable')
+        row_groups = np.split(by_row, np.flatnonzero(np.diff(snapped_y[by_row])) + 1)
+
+        # Centres des colonnes de référence, testés d'un coup contre les cellules de chaque ligne
+        ref_centers = np.array([get_center(c) for c in reference_cols], dtype=np.float64).reshape(-1, 2)
+        ref_x, ref_y = ref_centers[:, 0:1], ref_centers[:, 1:2]
+
+        cell_texts = [" ".join(cell.texts) for cell in cellulesArray]
 
         # 2. Pour chaque ligne déduite, appliquer la duplication
-        for snapped_y in sorted(row_groups.keys()):
-            cells_in_row = row_groups[snapped_y]
-            if not cells_in_row: continue
-
-            flat_row = []
-            for ref_col_box in reference_cols:
-                ref_col_center = get_center(ref_col_box)
-                found_cell_text = ""
-                for cell in cells_in_row:
-                    if is_contained(ref_col_center, cell.box):
-                        found_cell_text = " ".join(cell.texts)
-                        break
-                flat_row.append(found_cell_text)
+        for cells_in_row in row_groups:
+            row_boxes = cell_boxes[cells_in_row]
+            inside = ((row_boxes[None, :, 0] <= ref_x) & (ref_x <= row_boxes[None, :, 2])
+                      & (row_boxes[None, :, 1] <= ref_y) & (ref_y <= row_boxes[None, :, 3]))
+            # Première cellule de la ligne contenant le centre de chaque colonne, "" sinon
+            first_match = inside.argmax(axis=1)
+            flat_row = [
+                cell_texts[cell_index] if found else ""
+                for found, cell_index in zip(inside.any(axis=1).tolist(), cells_in_row[first_match].tolist())
+            ]
 
             if any(cell_text for cell_text in flat_row):
                 structured_rows.append(flat_row)
@@ -106,8 +106,8 @@ if __name__ == "__main__":
 
     print(f"Lancement du débogage final pour la page {PAGE_INDEX_TO_DEBUG} de {original_doc_path.name}")
 
-    with open(original_doc_path, "r", encoding="utf-8") as f: original_doc = json.load(f)
-    with open(table_doc_path, "r", encoding="utf-8") as f: tables_doc = json.load(f)
+    original_doc = read_json(original_doc_path)
+    tables_doc = read_json(table_doc_path)
         
     original_page = next((p for p in original_doc if p['index'] == PAGE_INDEX_TO_DEBUG), None)
     table_page_info = next((t for t in tables_doc if t['index'] == PAGE_INDEX_TO_DEBUG), None)
@@ -123,7 +123,6 @@ if __name__ == "__main__":
             output_path = Path(__file__).parent / f"debug_{original_doc_path.stem}_page_{PAGE_INDEX_TO_DEBUG}_final.json"
             
             print("\n--- Sauvegarde du résultat final ---")
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(result_layout, f, indent=2, ensure_ascii=False)
+            write_json(result_layout, output_path)
             
             print(f"Le layout traité a été sauvegardé dans : {output_path}")
\ No newline at end of file
@@ -1,11 +1,17 @@
-import json
+import os
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
 import shutil
 
+import numpy as np
+
+from manage_dataset import read_json, scan_json, write_json
+from table_geometry import best_cells, centers_contained, grid_cells, split_table_data
+
 # --- Structure de Données ---
-@dataclass
+@dataclass(slots=True)
 class TableCell:
     """Structure de données pour une cellule de tableau."""
     box: List[float]
@@ -17,23 +23,6 @@ class TableCell:
     @property
     def y1(self): return self.box[1]
 
-# --- Fonctions Utilitaires ---
-def get_intersection(box1: List[float], box2: List[float]) -> Optional[List[float]]:
-    """Calcule la boîte d'intersection entre deux boîtes."""
-    x1, y1, x2, y2 = max(box1[0], box2[0]), max(box1[1], box2[1]), min(box1[2], box2[2]), min(box1[3], box2[3])
-    if x1 < x2 and y1 < y2:
-        return [x1, y1, x2, y2]
-    return None
-
-def get_area(box: List[float]) -> float:
-    """Calcule l'aire d'une boîte."""
-    return (box[2] - box[0]) * (box[3] - box[1])
-
-def is_contained(inner_box: List[float], outer_box: List[float]) -> bool:
-    """Vérifie si le centre d'une boîte est contenu dans une autre."""
-    center_x, center_y = (inner_box[0] + inner_box[2]) / 2, (inner_box[1] + inner_box[3]) / 2
-    return (outer_box[0] <= center_x <= outer_box[2] and outer_box[1] <= center_y <= outer_box[3])
-
 class TableProcessor:
     """Contient la logique de traitement des tableaux."""
 
@@ -49,27 +38,24 @@ class TableProcessor:
             Layout modifié avec structured_table_data
         """
         # ÉTAPE 1: Générer toutes les cellules possibles du tableau
-        rows = [d['bbox'] for d in table_structure['table_data'] if d['label'] in ('table row', 'table row header')]
-        cols = [d['bbox'] for d in table_structure['table_data'] if d['label'] in ('table column', 'table column header')]
+        rows, cols, spanning_cells_data = split_table_data(table_structure['table_data'])
         
         print(f"    Trouvé {len(rows)} lignes et {len(cols)} colonnes")
         
-        cellulesArray = []
-        for r_box in rows:
-            for c_box in cols:
-                cell_box = get_intersection(r_box, c_box)
-                if cell_box and get_area(cell_box) > 0:
-                    cellulesArray.append(TableCell(box=cell_box))
+        # Toutes les intersections ligne x colonne en une seule opération vectorisée
+        unit_boxes = grid_cells(rows, cols)
         
-        print(f"    Généré {len(cellulesArray)} cellules unitaires")
+        print(f"    Généré {len(unit_boxes)} cellules unitaires")
         
         # ÉTAPE 2: Minimisation des cellules (gestion des 'merged cells')
-        spanning_cells_data = [d['bbox'] for d in table_structure['table_data'] if d['label'] == 'table spanning cell']
         print(f"    Trouvé {len(spanning_cells_data)} cellules fusionnées")
         
+        # Centres des cellules unitaires testés contre toutes les cellules fusionnées en une seule matrice
+        # Les TableCell ne sont créées que pour les cellules unitaires conservées
+        covered = centers_contained(unit_boxes, spanning_cells_data)
         unit_cells_to_keep = [
-            unit_cell for unit_cell in cellulesArray 
-            if not any(is_contained(unit_cell.box, sp_box) for sp_box in spanning_cells_data)
+            TableCell(box=unit_box) for unit_box, is_covered in zip(unit_boxes, covered)
+            if not is_covered
         ]
         
         spanning_cells = [TableCell(box=sp_box) for sp_box in spanning_cells_data]
@@ -93,46 +79,44 @@ class TableProcessor:
         
         print(f"    Traitement de {len(text_boxes)} éléments de texte")
         
-        for text_bbox, text_content in zip(text_boxes, texts):
-            best_cell = max(cellulesArray, key=lambda cell: get_area(get_intersection(text_bbox, cell.box) or [0,0,0,0]))
-            intersection_area = get_area(get_intersection(text_bbox, best_cell.box) or [0,0,0,0])
-            
-            if intersection_area > 0:
-                best_cell.texts_bboxes.append(text_bbox)
-                best_cell.texts.append(text_content)
+        # Géométrie des cellules en un seul tableau contigu (C, 4), partagé par les étapes 3 et 5
+        cell_boxes = np.asarray([cell.box for cell in cellulesArray], dtype=np.float64)
+        
+        # Matrice des aires texte x cellule : meilleure cellule de chaque texte par argmax
+        text_boxes_array = np.asarray(text_boxes, dtype=np.float64).reshape(-1, 4)
+        best_indices = best_cells(text_boxes_array, cell_boxes)
                 
-        # ÉTAPE 4: Ordonner le texte à l'intérieur de chaque cellule
-        for cell in cellulesArray:
-            if len(cell.texts) > 1:
-                sorted_items = sorted(zip(cell.texts_bboxes, cell.texts), key=lambda item: (item[0][1], item[0][0]))
-                if sorted_items:
-                    cell.texts_bboxes, cell.texts = list(zip(*sorted_items))
-                else:
-                    cell.texts_bboxes, cell.texts = [], []
+        # ÉTAPE 4: Ordonner le texte à l'intérieur de chaque cellule, par un seul tri stable
+        # (cellule, y1, x1) de tous les textes affectés, puis ajout dans cet ordre
+        assigned = np.flatnonzero(best_indices >= 0)
+        order = assigned[np.lexsort((text_boxes_array[assigned, 0], text_boxes_array[assigned, 1],
+                                     best_indices[assigned]))]
+        # Indices en entiers Python : pas de scalaires NumPy dans la boucle
+        cell_of_text = best_indices.tolist()
+        for i in order.tolist():
+            best_cell = cellulesArray[cell_of_text[i]]
+            best_cell.texts_bboxes.append(text_boxes[i])
+            best_cell.texts.append(texts[i])
 
         # ÉTAPE 5: Extraction des lignes structurées
         structured_rows = []
         sorted_rows = sorted(rows, key=lambda b: b[1])  # Trier par Y
+        rows_array = np.asarray(sorted_rows, dtype=np.float64).reshape(-1, 4)
+        row_centers_y = (rows_array[:, 1] + rows_array[:, 3]) / 2
         
-        for r_box in sorted_rows:
-            row_center_y = (r_box[1] + r_box[3]) / 2
-            
-            # Trouver toutes les cellules qui appartiennent à cette ligne
-            cells_in_row = []
-            for cell in cellulesArray:
-                cell_center_y = (cell.box[1] + cell.box[3]) / 2
-                if abs(cell_center_y - row_center_y) < 10:  # Tolérance de 10 pixels
-                    cells_in_row.append(cell)
-            
-            # Trier les cellules par X (gauche vers droite)
-            sorted_cells = sorted(cells_in_row, key=lambda c: c.x1)
-            
-            # Extraire le texte de chaque cellule
-            row_texts = []
-            for cell in sorted_cells:
-                cell_text = " ".join(cell.texts) if cell.texts else ""
-                row_texts.append(cell_text)
-            
+        # Trier les cellules par X (gauche vers droite) une seule fois, tri stable comme sorted()
+        by_x = np.argsort(cell_boxes[:, 0], kind='stable')
+        cell_centers_y = (cell_boxes[by_x, 1] + cell_boxes[by_x, 3]) / 2
+        
+        # Appartenance de chaque cellule à chaque ligne (tolérance de 10 pixels), en une seule matrice
+        in_row = np.abs(cell_centers_y[None, :] - row_centers_y[:, None]) < 10
+        
+        # Texte de chaque cellule joint une seule fois, même si elle appartient à plusieurs lignes
+        cell_texts = [" ".join(cell.texts) for cell in cellulesArray]
+        
+        for row_mask in in_row:
+            # Extraire le texte de chaque cellule de cette ligne, déjà ordonnées de gauche à droite
+            row_texts = [cell_texts[i] for i in by_x[row_mask].tolist()]
             structured_rows.append(row_texts)
             
         print(f"    Généré {len(structured_rows)} lignes structurées")
@@ -146,14 +130,18 @@ class TableProcessor:
 class BatchTableProcessor:
     """Traite tous les tableaux en lot."""
     
-    def __init__(self, base_dir: str = "states"):
+    def __init__(self, base_dir: str = "states", max_workers: Optional[int] = None):
         self.base_dir = Path(base_dir)
+        self.max_workers = max_workers or os.cpu_count() or 1
         self.result_json_dir = self.base_dir / "result_json"
         self.result_json_tables_dir = self.base_dir / "result_json_tables"
         self.output_dir = self.base_dir / "result_json_processed"
         
         self.table_processor = TableProcessor()
         
+        # Chemins des documents originaux, indexés une fois par process_all_documents
+        self._original_files: Optional[set] = None
+        
         # Statistiques
         self.stats = {
             'files_processed': 0,
@@ -169,16 +157,37 @@ class BatchTableProcessor:
         # Créer le dossier de sortie
         self.output_dir.mkdir(exist_ok=True)
         
+        # Indexer les documents originaux en un seul parcours : pas de exists() par fichier de tables
+        if self.result_json_dir.is_dir():
+            self._original_files = {Path(entry.path) for entry in scan_json(self.result_json_dir)}
+        else:
+            self._original_files = set()
+        
         # Parcourir tous les fichiers de tables
-        for table_file in self.result_json_tables_dir.rglob("*.json"):
-            try:
-                self.process_document(table_file)
-            except Exception as e:
-                print(f"Erreur lors du traitement de {table_file}: {e}")
-                self.stats['errors'] += 1
+        table_files = [entry.path for entry in scan_json(self.result_json_tables_dir)]
+        
+        if self.max_workers > 1 and len(table_files) > 1:
+            # Les documents sont indépendants : chaque processus du pool reçoit une copie
+            # de ce BatchTableProcessor et renvoie les statistiques de chaque fichier
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(table_files)),
+                                     initializer=_init_worker, initargs=(self,)) as pool:
+                for file_stats in pool.map(_process_table_file, table_files, chunksize=4):
+                    for key, value in file_stats.items():
+                        self.stats[key] += value
+        else:
+            for table_file in table_files:
+                self.process_file(Path(table_file))
         
         self.print_statistics()
     
+    def process_file(self, table_file: Path):
+        """Traite un fichier de tables en comptabilisant l'erreur éventuelle."""
+        try:
+            self.process_document(table_file)
+        except Exception as e:
+            print(f"Erreur lors du traitement de {table_file}: {e}")
+            self.stats['errors'] += 1
+    
     def process_document(self, table_file_path: Path):
         """Traite un document spécifique."""
         # Construire le chemin du fichier original correspondant
@@ -192,21 +201,21 @@ class BatchTableProcessor:
         
         original_file_path = self.result_json_dir / relative_path.parent / original_filename
         
-        if not original_file_path.exists():
+        if self._original_files is not None:
+            original_found = original_file_path in self._original_files
+        else:
+            original_found = original_file_path.exists()
+        if not original_found:
             print(f"Fichier original non trouvé: {original_file_path}")
             return
         
         print(f"\nTraitement de {table_file_path.name} avec {original_file_path.name}")
         
         # Charger les fichiers
-        with open(table_file_path, "r", encoding="utf-8") as f:
-            tables_doc = json.load(f)
-        
-        with open(original_file_path, "r", encoding="utf-8") as f:
-            original_doc = json.load(f)
+        tables_doc = read_json(table_file_path)
         
-        # Créer une copie du document original pour modification
-        processed_doc = json.loads(json.dumps(original_doc))  # Deep copy
+        # Le document original fraîchement chargé sert directement de copie de travail
+        processed_doc = read_json(original_file_path)
         
         # Traiter chaque page avec tableaux
         tables_by_page = {table_info['index']: table_info for table_info in tables_doc}
@@ -223,8 +232,7 @@ class BatchTableProcessor:
         output_file_path = self.output_dir / relative_path.parent / original_filename
         output_file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_file_path, "w", encoding="utf-8") as f:
-            json.dump(processed_doc, f, indent=2, ensure_ascii=False)
+        write_json(processed_doc, output_file_path)
         
         print(f"Document traité sauvegardé: {output_file_path}")
         self.stats['files_processed'] += 1
@@ -234,26 +242,25 @@ class BatchTableProcessor:
         page_layouts = page.get('page', [])
         table_structures = table_page_info.get('page_data', [])
         
-        # Trouver tous les layouts avec label "Table"
-        table_layouts = [layout for layout in page_layouts if layout.get('label') == 'Table']
+        # Trouver les positions de tous les layouts avec label "Table"
+        table_indices = [index for index, layout in enumerate(page_layouts) if layout.get('label') == 'Table']
         
-        print(f"  Page {page['index']}: {len(table_layouts)} layout(s) Table, {len(table_structures)} structure(s)")
+        print(f"  Page {page['index']}: {len(table_indices)} layout(s) Table, {len(table_structures)} structure(s)")
         
-        if not table_layouts or not table_structures:
+        if not table_indices or not table_structures:
             return
         
         # Associer chaque layout de table avec sa structure
         # Pour simplifier, on associe dans l'ordre (peut être amélioré avec une logique de correspondance spatiale)
-        for i, table_layout in enumerate(table_layouts):
+        for i, layout_index in enumerate(table_indices):
             if i < len(table_structures):
                 table_structure = table_structures[i]
                 print(f"    Traitement du tableau {i+1}")
                 
                 try:
-                    processed_layout = self.table_processor.process_table_layout(table_layout, table_structure)
+                    processed_layout = self.table_processor.process_table_layout(page_layouts[layout_index], table_structure)
                     
-                    # Remplacer le layout original par le layout traité
-                    layout_index = page_layouts.index(table_layout)
+                    # Remplacer le layout original par le layout traité (position connue, sans recherche)
                     page_layouts[layout_index] = processed_layout
                     
                     self.stats['tables_processed'] += 1
@@ -274,6 +281,19 @@ class BatchTableProcessor:
         print(f"Erreurs rencontrées: {self.stats['errors']}")
         print("=" * 40)
 
+# BatchTableProcessor propre à chaque processus du pool
+_worker_processor: Optional[BatchTableProcessor] = None
+
+def _init_worker(processor: BatchTableProcessor):
+    global _worker_processor
+    _worker_processor = processor
+
+def _process_table_file(table_file: str) -> Dict[str, int]:
+    # Statistiques remises à zéro : le processus parent fait la somme
+    _worker_processor.stats = dict.fromkeys(_worker_processor.stats, 0)
+    _worker_processor.process_file(Path(table_file))
+    return _worker_processor.stats
+
 def main():
     """Fonction principale."""
     # Changer vers le répertoire parent pour accéder au dossier states
@@ -0,0 +1,64 @@
+# table_geometry.py
+# Calculs vectorisés sur les boîtes [x1, y1, x2, y2] partagés par les scripts passe4_processTables*.
+
+from typing import List, Dict, Any
+
+import numpy as np
+
+ROW_LABELS = frozenset(('table row', 'table row header'))
+COLUMN_LABELS = frozenset(('table column', 'table column header'))
+SPANNING_CELL_LABELS = frozenset(('table spanning cell',))
+
+def intersection_areas(boxes_a: List[List[float]], boxes_b: List[List[float]]) -> np.ndarray:
+    """Aires d'intersection (len(boxes_a), len(boxes_b)) de toutes les paires de boîtes, 0 sans recouvrement."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    widths = np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    heights = np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    # Recouvrement strict sur les deux axes
+    return np.where((widths > 0) & (heights > 0), widths * heights, 0.0)
+
+def centers_contained(inner_boxes: List[List[float]], outer_boxes: List[List[float]]) -> np.ndarray:
+    """Pour chaque boîte de inner_boxes, vrai si son centre est contenu dans au moins une boîte de outer_boxes."""
+    inner = np.asarray(inner_boxes, dtype=np.float64).reshape(-1, 4)
+    outer = np.asarray(outer_boxes, dtype=np.float64).reshape(-1, 4)
+    center_x = ((inner[:, 0] + inner[:, 2]) / 2)[:, None]
+    center_y = ((inner[:, 1] + inner[:, 3]) / 2)[:, None]
+    # Bornes incluses
+    inside = ((outer[None, :, 0] <= center_x) & (center_x <= outer[None, :, 2])
+              & (outer[None, :, 1] <= center_y) & (center_y <= outer[None, :, 3]))
+    return inside.any(axis=1)
+
+def grid_cells(rows: List[List[float]], cols: List[List[float]]) -> List[List[float]]:
+    """Boîtes des intersections ligne x colonne d'aire non nulle, dans l'ordre ligne par ligne."""
+    r = np.asarray(rows, dtype=np.float64).reshape(-1, 4)
+    c = np.asarray(cols, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(r[:, None, 0], c[None, :, 0])
+    y1 = np.maximum(r[:, None, 1], c[None, :, 1])
+    x2 = np.minimum(r[:, None, 2], c[None, :, 2])
+    y2 = np.minimum(r[:, None, 3], c[None, :, 3])
+    valid = (x1 < x2) & (y1 < y2) & ((x2 - x1) * (y2 - y1) > 0)
+    return np.stack([x1, y1, x2, y2], axis=-1)[valid].tolist()
+
+def best_cells(text_boxes: List[List[float]], cell_boxes: List[List[float]]) -> np.ndarray:
+    """Pour chaque boîte de texte, l'indice de la cellule la plus recouverte (la première en cas d'égalité), -1 sinon."""
+    areas = intersection_areas(text_boxes, cell_boxes)
+    best = areas.argmax(axis=1)
+    return np.where(areas[np.arange(len(best)), best] > 0, best, -1)
+
+def split_table_data(table_data: List[Dict[str, Any]], super_cell_labels=SPANNING_CELL_LABELS):
+    """
+    Répartit en une seule passe les bbox des composants du tableau en lignes, colonnes et cellules fusionnées.
+
+    Un label de super_cell_labels qui est aussi un label de ligne ou de colonne (en-têtes) va dans les deux listes.
+    """
+    rows, cols, super_cells = [], [], []
+    for d in table_data:
+        label = d['label']
+        if label in ROW_LABELS:
+            rows.append(d['bbox'])
+        elif label in COLUMN_LABELS:
+            cols.append(d['bbox'])
+        if label in super_cell_labels:
+            super_cells.append(d['bbox'])
+    return rows, cols, super_cells
@@ -1,6 +1,8 @@
 import json
-import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.collections import PatchCollection
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from pathlib import Path
 
 def visualize_table_structure_v2(json_path: Path, page_index_to_find: int):
@@ -28,7 +30,10 @@ def visualize_table_structure_v2(json_path: Path, page_index_to_find: int):
     table_components = page_data.get("table_data", [])
     overall_table_bbox = page_data.get("table")
 
-    fig, ax = plt.subplots(figsize=(15, 20))
+    # Figure Agg hors de pyplot : le script ne fait qu'enregistrer un PNG
+    fig = Figure(figsize=(15, 20))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     ax.set_title(f"Structure de Tableau Améliorée - {json_path.name} - Page {page_index_to_find}", fontsize=16)
 
     color_map = {
@@ -44,35 +49,35 @@ def visualize_table_structure_v2(json_path: Path, page_index_to_find: int):
     grid_components = [c for c in table_components if c['label'] in ('table row', 'table column')]
     logical_components = [c for c in table_components if c['label'] not in ('table row', 'table column')]
 
-    # 2. Dessiner la grille de base en pointillé
-    for component in grid_components:
-        bbox = component.get("bbox")
-        if not bbox: continue
-        width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
-        rect = patches.Rectangle(
-            (bbox[0], bbox[1]), width, height,
-            linewidth=1,
-            edgecolor='gray',
-            facecolor='none',
-            linestyle='--' # Style en pointillé
-        )
-        ax.add_patch(rect)
+    # 2. Dessiner la grille de base en pointillé (une seule collection pour tous les rectangles)
+    grid_rects = [
+        patches.Rectangle((bbox[0], bbox[1]), bbox[2] - bbox[0], bbox[3] - bbox[1])
+        for bbox in (component.get("bbox") for component in grid_components) if bbox
+    ]
+    ax.add_collection(PatchCollection(
+        grid_rects,
+        linewidths=1,
+        edgecolors='gray',
+        facecolors='none',
+        linestyles='--' # Style en pointillé
+    ))
 
     # 3. Dessiner les cellules logiques par-dessus avec des lignes pleines et colorées
+    logical_rects, logical_colors = [], []
     for component in logical_components:
         label = component.get("label", "unknown")
         bbox = component.get("bbox")
         if not bbox: continue
         color = color_map.get(label, "black")
-        width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
-        rect = patches.Rectangle(
-            (bbox[0], bbox[1]), width, height,
-            linewidth=2.5, # Plus épais
-            edgecolor=color,
-            facecolor='none' # Pas de remplissage pour mieux voir
-        )
-        ax.add_patch(rect)
+        logical_rects.append(patches.Rectangle((bbox[0], bbox[1]), bbox[2] - bbox[0], bbox[3] - bbox[1]))
+        logical_colors.append(color)
         ax.text(bbox[0], bbox[1] - 5, label, fontsize=9, color=color, weight='bold')
+    ax.add_collection(PatchCollection(
+        logical_rects,
+        linewidths=2.5, # Plus épais
+        edgecolors=logical_colors,
+        facecolors='none' # Pas de remplissage pour mieux voir
+    ))
     # --- FIN DE LA NOUVELLE LOGIQUE ---
 
     if overall_table_bbox:
@@ -90,8 +95,7 @@ def visualize_table_structure_v2(json_path: Path, page_index_to_find: int):
     ax.grid(False) # La grille de matplotlib n'est plus utile
 
     output_filename = f"{json_path.stem}_page_{page_index_to_find}_structure_v2.png"
-    plt.savefig(output_filename, dpi=150, bbox_inches='tight')
-    plt.close(fig)
+    fig.savefig(output_filename, dpi=150, bbox_inches='tight')
     print(f"Visualisation améliorée sauvegardée sous : '{output_filename}'")
 
 if __name__ == "__main__":